@@ -21,19 +21,21 @@ logger = logging.getLogger(__name__)
 # ==========================================
 from config import Config
 
-from services.currency_service import fetch_currencies
-from services.gold_service import fetch_golds
-from services.silver_service import fetch_silvers
-from services.news_service import haberleri_cek
+from services.budget import JOBS, run_scheduled, run_manual, budget_stats
 from services.maintenance_service import weekly_maintenance
+from services.pipeline import pipeline_stats
+from services.tick_store import warm as warm_tick_store, tick_store_stats
 
 from routes.currency_routes import currency_bp
 from routes.gold_routes import gold_bp
 from routes.silver_routes import silver_bp
 from routes.news_routes import news_bp
 
-from models.db import get_db, put_db, close_all_connections
+from models.db import db_connection, close_all_connections, pool_stats
 from models.currency_models import init_db
+from utils.cache import cache_stats
+from utils.quota import quota_stats
+from utils.parallel import run_parallel
 
 # ==========================================
 # FLASK APP
@@ -69,42 +71,22 @@ def init_scheduler():
         )
         logger.info("📅 Haftalık bakım job'u eklendi (Her Pazar 04:00)")
 
-        # Haberler (30 dakika)
-        scheduler.add_job(
-            haberleri_cek, 
-            "interval", 
-            minutes=30, 
-            id="haber_job",
-            name="Haber güncelleme"
-        )
-
-        # Finans güncellemeleri (10 dakika - KuraBak ile aynı)
-        scheduler.add_job(
-            fetch_currencies, 
-            "interval", 
-            minutes=10, 
-            id="currency_job",
-            name="Döviz güncelleme"
-        )
-        scheduler.add_job(
-            fetch_golds, 
-            "interval", 
-            minutes=10, 
-            id="gold_job",
-            name="Altın güncelleme"
-        )
-        scheduler.add_job(
-            fetch_silvers, 
-            "interval", 
-            minutes=10, 
-            id="silver_job",
-            name="Gümüş güncelleme"
-        )
+        # Upstream işleri (kota bütçeli): her tick'te hedef aralık dolmuşsa çalışır
+        # Finans en sık 10 dakika, haber en sık 30 dakika; kota azaldıkça seyrekleşir
+        for name in JOBS:
+            scheduler.add_job(
+                run_scheduled,
+                "interval",
+                seconds=Config.BUDGET_TICK_SECONDS,
+                args=[name],
+                id=f"{name}_job",
+                name=f"{name} güncelleme (bütçeli)"
+            )
 
         scheduler.start()
         atexit.register(lambda: scheduler.shutdown())
         
-        logger.info("🚀 Scheduler başlatıldı (Finans: 10 dakika, Haber: 30 dakika)")
+        logger.info("🚀 Scheduler başlatıldı (kota bütçeli; Finans ≥10 dakika, Haber ≥30 dakika)")
 
     except Exception as e:
         logger.error(f"❌ Scheduler hata: {e}")
@@ -118,6 +100,9 @@ logger.info("🔧 NouvsApp Backend başlıyor...")
 # Database connection pool ve tablolar
 init_db()
 
+# Worker içi ham tick deposu (son günlerin /history sorguları)
+warm_tick_store()
+
 # Scheduler başlat
 if not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
     init_scheduler()
@@ -136,10 +121,10 @@ def home():
         "version": "8.0",
         "database": "PostgreSQL + Redis",
         "features": [
-            "Redis cache sistemi",
+            "İki katmanlı cache (worker LRU + Redis / shared memory)",
             "Connection pool (2-20)",
-            "10 dakikalık finans güncelleme",
-            "30 dakikalık haber güncelleme",
+            "Kota bütçeli finans güncelleme (en sık 10 dakika)",
+            "Kota bütçeli haber güncelleme (en sık 30 dakika)",
             "Haftalık otomatik bakım (Pazar 04:00)",
             "30 günlük veri saklama"
         ],
@@ -150,22 +135,20 @@ def home():
 @app.route("/health", methods=["GET", "HEAD"])
 def health():
     try:
-        conn = get_db()
-        cur = conn.cursor()
-
         # Tablo sayılarını al
         counts = {}
         
-        tables = ['haberler', 'currencies', 'golds', 'silvers']
-        for table in tables:
-            try:
-                cur.execute(f"SELECT COUNT(*) FROM {table}")
-                counts[table] = cur.fetchone()[0]
-            except:
-                counts[table] = 0
-
-        cur.close()
-        put_db(conn)
+        with db_connection() as conn:
+            cur = conn.cursor()
+            tables = ['haberler', 'currencies', 'golds', 'silvers']
+            for table in tables:
+                try:
+                    cur.execute(f"SELECT COUNT(*) FROM {table}")
+                    counts[table] = cur.fetchone()[0]
+                except:
+                    conn.rollback()
+                    counts[table] = 0
+            cur.close()
 
         return jsonify({
             "status": "healthy",
@@ -182,20 +165,45 @@ def health():
         }), 500
 
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Worker içi cache sayaçları (hit/miss), DB pool ve pipeline metrikleri"""
+    return jsonify({
+        "pid": os.getpid(),
+        "cache": cache_stats(),
+        "db_pool": pool_stats(),
+        "pipelines": pipeline_stats(),
+        "quota": quota_stats(),
+        "jobs": budget_stats(),
+        "tick_store": tick_store_stats(),
+        "timestamp": datetime.now().isoformat()
+    }), 200
+
+
 @app.route("/api/update", methods=["POST", "GET"])
 def manual_update():
     """Manuel güncelleme endpoint'i"""
     try:
         logger.info("⚡ Manuel güncelleme tetiklendi...")
         
-        haberleri_cek()
-        fetch_currencies()
-        fetch_golds()
-        fetch_silvers()
+        # Birbirinden bağımsız 4 upstream işi aynı anda, tek toplam süre ile
+        # (yakın zamanda çalışmış işler tekrar upstream'e gitmez, bkz. services/budget)
+        results = run_parallel(
+            {name: (lambda name=name: run_manual(name)) for name in JOBS},
+            deadline=Config.MANUAL_UPDATE_DEADLINE
+        )
+        
+        status = {
+            name: (str(result) if isinstance(result, Exception) else result)
+            for name, result in results.items()
+        }
+        
+        failed = [name for name, result in results.items() if isinstance(result, Exception)]
         
         return jsonify({
-            "success": True,
-            "message": "Tüm veriler güncellendi",
+            "success": not failed,
+            "message": "Tüm veriler güncellendi" if not failed else f"Tamamlanamayanlar: {', '.join(failed)}",
+            "results": status,
             "timestamp": datetime.now().isoformat()
         }), 200
         
@@ -14,12 +14,113 @@ class Config:
     
     # Eğer Render/Heroku DATABASE_URL veriyorsa override et
     DATABASE_URL = os.environ.get("DATABASE_URL")
+    # Opsiyonel read replica (sadece okuma yapan API route'ları için)
+    DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL")
+    DB_REPLICA_MAXCONN = 20
+    REPLICA_MAX_LAG_SECONDS = int(os.environ.get("REPLICA_MAX_LAG_SECONDS", "30"))
+    REPLICA_LAG_CHECK_INTERVAL = 15  # Gecikme kaç saniyede bir ölçülür
+    
+    DB_POOL_TIMEOUT = 5  # Pool doluysa bağlantı için en fazla bekleme (saniye)
+    DB_POOL_DEBUG = os.environ.get("DB_POOL_DEBUG", "0") == "1"  # Checkout çağrı yerlerini kaydet
+    DB_LEAK_SECONDS = int(os.environ.get("DB_LEAK_SECONDS", "30"))  # Bu süreden uzun tutulan bağlantı = şüpheli sızıntı
+    DB_SLOW_CHECKOUT_MS = 500  # Bundan uzun bekleyen checkout loglanır
     
     # ======================================
     # REDIS (YENİ ✓)
     # ======================================
     REDIS_URL = os.environ.get("REDIS_URL")
+    # auto: REDIS_URL varsa redis, yoksa shm (aynı host'taki worker'lar arası /dev/shm)
+    CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "auto")
+    CACHE_SHM_DIR = os.environ.get("CACHE_SHM_DIR")  # None → /dev/shm/nouvsapp-cache
     CACHE_TIMEOUT = 300  # 5 dakika (saniye)
+    CACHE_LOCAL_TTL = 60  # Worker içi LRU'da en fazla 60 saniye
+    CACHE_LOCAL_MAX_ITEMS = 512  # Worker içi LRU kapasitesi
+    HISTORY_CACHE_TIMEOUT = 120  # Geçmiş sorguları (saniye)
+    SNAPSHOT_TIMEOUT = 1800  # Servislerin yayınladığı snapshot'lar (3 güncelleme periyodu)
+    CACHE_GENERATION_TTL = 2  # Generation numarası worker içinde kaç saniye hatırlanır
+    CACHE_STALE_TTL = 60  # TTL sonrası stale-while-revalidate penceresi (saniye)
+    CACHE_LOCK_TIMEOUT_MS = 5000  # Process'ler arası yükleme kilidi / bekleme süresi
+    CACHE_NEGATIVE_TTL = 30  # "Bulunamadı" (404) sonuçları (saniye)
+    NEWS_CACHE_TIMEOUT = 600  # Haber listeleri (yeni haberde generation zaten artar)
+    
+    # ======================================
+    # HTTP CACHE (ETag / Cache-Control / sıkıştırma)
+    # ======================================
+    # Finans 10 dakikada, haberler 30 dakikada bir güncelleniyor
+    FINANCE_MAX_AGE = 60
+    FINANCE_STALE_WHILE_REVALIDATE = 600
+    HISTORY_MAX_AGE = 120
+    NEWS_MAX_AGE = 300
+    NEWS_STALE_WHILE_REVALIDATE = 1800
+    COMPRESS_MIN_BYTES = 512  # Bundan küçük gövdeler sıkıştırılmaz
+    GZIP_LEVEL = 6
+    BROTLI_QUALITY = 5
+    
+    # ======================================
+    # GEÇMİŞ (history)
+    # ======================================
+    # Aynı kur tekrar gelirse son satır uzatılır; bu süreden uzun
+    # boşluktan sonra (servis durmuşsa) yeni satır açılır
+    HISTORY_MAX_GAP_MINUTES = 30
+    
+    # /history çözünürlüğü (interval verilmezse): days <= 2 ham tick,
+    # <= 14 saatlik, üstü günlük OHLC (price_rollups)
+    HISTORY_RAW_MAX_DAYS = 2
+    HISTORY_HOURLY_MAX_DAYS = 14
+    ROLLUP_HOURLY_RETENTION_DAYS = 90  # Saatlik kovalar bakımda silinir, günlükler kalır
+    HISTORY_MAX_DAYS = 365  # /history days üst sınırı (günlük kovalar)
+    
+    # Ham geçmiş tabloları aylık partition'lı (models/partitions)
+    HISTORY_PARTITIONS_AHEAD = 2  # Bu ay + 2 ay önceden açılır
+    HISTORY_RETENTION_MONTHS = 6  # Daha eski aylar bakımda DETACH + DROP (uzun vade: günlük OHLC)
+    
+    # Worker içi ham tick deposu (services/tick_store): son N gün bellekte
+    TICK_STORE_DAYS = 7
+    TICK_STORE_CAPACITY = 2048  # Sembol başına run sayısı (10 dk'lık tick'le ~14 gün)
+    
+    # /analytics: saatlik / günlük kapanışlar üzerinde SMA, EMA, volatilite ...
+    ANALYTICS_DEFAULT_DAYS = 30
+    ANALYTICS_MAX_DAYS = 365
+    ANALYTICS_HOURLY_MAX_DAYS = 30  # Daha uzun aralıklar günlük kovalarla
+    ANALYTICS_WINDOWS = {           # Kova cinsinden varsayılan pencereler
+        'hour': (24, 72, 168),
+        'day': (7, 30, 90),
+    }
+    ANALYTICS_MAX_WINDOWS = 6
+    
+    # ======================================
+    # UPSTREAM
+    # ======================================
+    MANUAL_UPDATE_DEADLINE = 25  # /api/update: haber + döviz + altın + gümüş toplam süre
+    
+    # (bağlantı, okuma) timeout'ları, saniye
+    UPSTREAM_TIMEOUTS = {
+        "collectapi": (3.05, 10),
+        "newsapi": (3.05, 6),
+    }
+    UPSTREAM_DEFAULT_TIMEOUT = (3.05, 10)
+    UPSTREAM_MAX_RETRIES = 2  # İlk istekten sonra en fazla 2 tekrar
+    UPSTREAM_BACKOFF_BASE = 0.5  # 0.5s, 1s, 2s ... (±%50 jitter)
+    UPSTREAM_BACKOFF_MAX = 4
+    UPSTREAM_POOL_CONNECTIONS = 4  # Host başına havuz sayısı
+    UPSTREAM_POOL_MAXSIZE = 10  # Havuz başına keep-alive bağlantı
+    # Deadline'lı çağrılarda (run_parallel): cevabın deadline'dan önce dönmesi
+    # için ayrılan pay ve bundan kısa süre kaldıysa yeni deneme başlatılmaz
+    UPSTREAM_DEADLINE_MARGIN = 0.5
+    UPSTREAM_MIN_ATTEMPT_SECONDS = 1.0
+    
+    # ======================================
+    # UPSTREAM KOTA / BÜTÇE
+    # ======================================
+    # Sağlayıcı başına günlük (UTC) çağrı hakkı
+    UPSTREAM_DAILY_QUOTA = {
+        "collectapi": int(os.environ.get("COLLECTAPI_DAILY_QUOTA", "500")),
+        "newsapi": int(os.environ.get("NEWSAPI_DAILY_QUOTA", "100")),
+    }
+    QUOTA_MANUAL_RESERVE = 0.1  # Kotanın zamanlanmış işlerin dokunmadığı, manuel tetiklemelere kalan payı
+    MANUAL_COALESCE_SECONDS = 120  # Bu süre içinde çalışmış işi manuel tetikleme tekrar çalıştırmaz
+    BUDGET_TICK_SECONDS = 60  # Zamanlanmış işlerin "sıra geldi mi" kontrol aralığı
+    JOB_LOCK_SECONDS = 120  # Aynı işin worker'lar arası tek çalışma kilidi
     
     # ======================================
     # CollectAPI Token
@@ -35,6 +136,17 @@ class Config:
     # HABERSEL (News) Ayarları
     # ======================================
     ALLOWED_SOURCES = ["NTV", "CNN", "Cumhuriyet", "HaberTürk"]
+    NEWS_FETCH_DEADLINE = 15  # Tüm kategori istekleri için toplam süre (saniye)
+    NEWS_FINGERPRINT_TTL = 6 * 3600  # Aynı NewsAPI cevabı bu süre içinde tekrar gelirse DB atlanır
+    NEWS_RETENTION_DAYS = 4  # haberleri_cek bundan eski haberleri siler
+    NEWS_MINHASH_PERMUTATIONS = 64  # Yakın kopya imzası uzunluğu
+    NEWS_LSH_ROWS = 4  # Bant başına satır (64 / 4 = 16 bant)
+    NEWS_CLUSTER_THRESHOLD = 0.5  # Tahmini Jaccard benzerliği bu değer ve üstüyse aynı küme
+    NEWS_CLUSTER_ID_OVERLAP = 1000  # Küme index'i eşitlenirken son id'nin bu kadar altından tekrar okunur
+    NEWS_MAX_PAGE_SIZE = 100  # /haberler, /kategori için en büyük limit
+    NEWS_SEARCH_DEFAULT_LIMIT = 20
+    NEWS_SEARCH_MAX_LIMIT = 50
+    NEWS_SEARCH_MAX_QUERY_LENGTH = 200
     
     # NewsAPI kategorileri
     KATEGORILER = [
@@ -71,6 +183,11 @@ class Config:
         "Reşat Lira Altın"
     ]
     
+    # TRY dışında bir para birimiyle fiyatlanan formatlar (CollectAPI onsu USD verir)
+    PRICE_QUOTE_CURRENCIES = {
+        "ONS Altın": "USD",
+    }
+    
     # ======================================
     # GÜMÜŞ FORMATLARI
     # ======================================
@@ -1,8 +1,14 @@
-from models.db import get_db, put_db
+from models.db import db_cursor
+from models.market_models import MARKET_TABLES, HISTORY_TABLES
+from models.partitions import ensure_history_table
+from config import Config
 import logging
 
 logger = logging.getLogger(__name__)
 
+# init_db'nin worker'lar arası advisory lock anahtarı
+INIT_LOCK_ID = 7412001
+
 # ==========================================
 # HABER TABLOLARI
 # ==========================================
@@ -10,17 +16,68 @@ def init_news_tables(cursor):
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS haberler (
             id SERIAL PRIMARY KEY,
-            baslik TEXT UNIQUE NOT NULL,
+            baslik TEXT NOT NULL,
             aciklama TEXT,
             gorsel TEXT,
             kaynak TEXT,
             url TEXT,
+            url_hash UUID,
             kategori TEXT,
             tarih TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
         );
     """)
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tarih ON haberler(tarih DESC);")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_kategori ON haberler(kategori);")
+    # Tekilleştirme: baslik UNIQUE (büyük TEXT index) yerine normalize URL'in
+    # md5'i (16 byte UUID). Eski tablolar için: kolon ekle, doldur, index'e geç.
+    cursor.execute("ALTER TABLE haberler ADD COLUMN IF NOT EXISTS url_hash UUID;")
+    cursor.execute("""
+        UPDATE haberler SET url_hash = md5(lower(url))::uuid
+        WHERE url_hash IS NULL AND url IS NOT NULL;
+    """)
+    cursor.execute("""
+        DELETE FROM haberler a USING haberler b
+        WHERE a.url_hash = b.url_hash AND a.id > b.id;
+    """)
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_haberler_url_hash ON haberler(url_hash);")
+    cursor.execute("ALTER TABLE haberler DROP CONSTRAINT IF EXISTS haberler_baslik_key;")
+    # Tam metin arama: başlık (A) + açıklama (B), Türkçe kök bulma.
+    # STORED generated kolon → INSERT/UPDATE'te Postgres kendisi günceller
+    cursor.execute("""
+        ALTER TABLE haberler ADD COLUMN IF NOT EXISTS arama tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('turkish'::regconfig, coalesce(baslik, '')), 'A') ||
+            setweight(to_tsvector('turkish'::regconfig, coalesce(aciklama, '')), 'B')
+        ) STORED;
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_haberler_arama ON haberler USING GIN (arama);")
+    # Keyset sayfalama: (tarih, id) sırası (tek kolonlu tarih index'inin işini de görür)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_haberler_tarih_id ON haberler(tarih DESC, id DESC);")
+    cursor.execute("DROP INDEX IF EXISTS idx_tarih, idx_kategori, idx_haberler_kategori_tarih_id;")
+    # Bir haber birden çok kategoride olabilir: kategoriler dizisi + GIN index
+    # (kategori kolonu haberin ilk geldiği kategori olarak kalır)
+    cursor.execute("ALTER TABLE haberler ADD COLUMN IF NOT EXISTS kategoriler TEXT[] NOT NULL DEFAULT '{}';")
+    cursor.execute("""
+        UPDATE haberler SET kategoriler = ARRAY[kategori]
+        WHERE kategoriler = '{}' AND kategori IS NOT NULL;
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_haberler_kategoriler ON haberler USING GIN (kategoriler);")
+    # /kategori sayfaları: GIN sıralama vermez → kategori başına (tarih, id)
+    # sıralı kısmi B-tree; sorgudaki "kategoriler @> ARRAY['x']" koşuluyla
+    # eşleşir, ilk sayfa LIMIT kadar satır okuyup durur
+    for kategori in Config.KATEGORILER:
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_haberler_kategori_{kategori}_tarih_id
+            ON haberler(tarih DESC, id DESC)
+            WHERE kategoriler @> ARRAY['{kategori}']::text[];
+        """)
+    # Yakın kopya kümeleri: kume_id = kümenin ilk haberinin url_hash'i,
+    # minhash = başlık + açıklamanın MinHash imzası (services/news_clusters)
+    cursor.execute("""
+        ALTER TABLE haberler
+            ADD COLUMN IF NOT EXISTS kume_id UUID,
+            ADD COLUMN IF NOT EXISTS minhash BYTEA;
+    """)
+    cursor.execute("UPDATE haberler SET kume_id = url_hash WHERE kume_id IS NULL;")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_haberler_kume ON haberler(kume_id, tarih DESC, id DESC);")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_kaynak ON haberler(kaynak);")
 
 # ==========================================
@@ -36,14 +93,8 @@ def init_currency_tables(cursor):
             updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
         );
     """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS currency_history (
-            id SERIAL PRIMARY KEY,
-            code VARCHAR(10),
-            rate FLOAT,
-            created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
-        );
-    """)
+    # Aylık partition'lı, run-length geçmiş (models/partitions)
+    ensure_history_table(cursor, 'currency_history', 'code')
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS golds (
             name VARCHAR(100) PRIMARY KEY,
@@ -54,14 +105,8 @@ def init_currency_tables(cursor):
             updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
         );
     """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS gold_history (
-            id SERIAL PRIMARY KEY,
-            name VARCHAR(100),
-            rate FLOAT,
-            created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
-        );
-    """)
+    # Aylık partition'lı, run-length geçmiş (models/partitions)
+    ensure_history_table(cursor, 'gold_history', 'name')
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS silvers (
             name VARCHAR(100) PRIMARY KEY,
@@ -72,14 +117,8 @@ def init_currency_tables(cursor):
             updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
         );
     """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS silver_history (
-            id SERIAL PRIMARY KEY,
-            name VARCHAR(100),
-            rate FLOAT,
-            created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
-        );
-    """)
+    # Aylık partition'lı, run-length geçmiş (models/partitions)
+    ensure_history_table(cursor, 'silver_history', 'name')
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS update_logs (
             id SERIAL PRIMARY KEY,
@@ -90,18 +129,58 @@ def init_currency_tables(cursor):
         );
     """)
 
+# ==========================================
+# OHLC ROLLUP TABLOSU
+# ==========================================
+def init_rollup_tables(cursor):
+    # Saatlik / günlük OHLC: her tick upsert_market_rows içinde kovasını günceller
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS price_rollups (
+            dataset VARCHAR(20) NOT NULL,
+            symbol VARCHAR(100) NOT NULL,
+            resolution VARCHAR(10) NOT NULL,
+            bucket TIMESTAMPTZ NOT NULL,
+            open FLOAT NOT NULL,
+            high FLOAT NOT NULL,
+            low FLOAT NOT NULL,
+            close FLOAT NOT NULL,
+            ticks INTEGER NOT NULL DEFAULT 1,
+            first_at TIMESTAMPTZ NOT NULL,
+            last_at TIMESTAMPTZ NOT NULL,
+            PRIMARY KEY (dataset, symbol, resolution, bucket)
+        );
+    """)
+
+    # İlk kurulumda mevcut geçmişten doldur (dataset için hiç kova yoksa)
+    for dataset, history_table in HISTORY_TABLES.items():
+        name_col = MARKET_TABLES[dataset]
+        cursor.execute(f"""
+            INSERT INTO price_rollups
+                (dataset, symbol, resolution, bucket, open, high, low, close, ticks, first_at, last_at)
+            SELECT %(dataset)s, h.{name_col}, r.resolution, date_trunc(r.resolution, h.created_at, 'UTC') AS bucket,
+                   (array_agg(h.rate ORDER BY h.created_at))[1],
+                   max(h.rate), min(h.rate),
+                   (array_agg(h.rate ORDER BY h.created_at DESC))[1],
+                   sum(h.tick_count), min(h.created_at), max(COALESCE(h.valid_until, h.created_at))
+            FROM {history_table} h
+            CROSS JOIN unnest(ARRAY['hour', 'day']) AS r(resolution)
+            WHERE h.{name_col} IS NOT NULL AND h.rate IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM price_rollups WHERE dataset = %(dataset)s)
+            GROUP BY h.{name_col}, r.resolution, bucket
+            ON CONFLICT DO NOTHING
+        """, {'dataset': dataset})
+
 # ==========================================
 # INIT DB
 # ==========================================
 def init_db():
     try:
-        conn = get_db()
-        cur = conn.cursor()
-        init_news_tables(cur)
-        init_currency_tables(cur)
-        conn.commit()
-        cur.close()
-        put_db(conn)
+        with db_cursor(commit=True) as cur:
+            # Her gunicorn worker'ı init_db çalıştırır → şema değişiklikleri sırayla
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (INIT_LOCK_ID,))
+            init_news_tables(cur)
+            init_currency_tables(cur)
+            init_rollup_tables(cur)
         logger.info("✅ Veritabanı tabloları oluşturuldu.")
         return True
     except Exception as e:
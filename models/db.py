@@ -1,7 +1,12 @@
 import psycopg2
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+from contextlib import contextmanager
 from config import Config
+from utils.cache import generation_age
 import urllib.parse as urlparse
+import threading
+import traceback
+import time
 import os
 import logging
 
@@ -30,41 +35,443 @@ else:
     DB_NAME = Config.DB_NAME
     logger.info(f"📡 Local database kullanılıyor (host: {DB_HOST})")
 
+
+class PoolTimeout(PoolError):
+    """Bekleme süresi içinde boş bağlantı bulunamadı"""
+
+
+# ==========================================
+# CONNECTION POOL (thread-safe + fork-safe)
+# ==========================================
+# Fork sonrası child'a geçen eski pool'lar burada tutulur: GC olup
+# kapanırlarsa parent'ın soketlerine Terminate mesajı gönderirler.
+_inherited_pools = []
+
+
+class ConnectionPool:
+    """
+    Thread-safe, fork-safe ve bekleme süreli bağlantı havuzu
+
+    - psycopg2 ThreadedConnectionPool üzerine kurulu (APScheduler thread'leri
+      ile request thread'leri aynı pool'u güvenle paylaşır)
+    - Pool ilk kullanımda ve her fork sonrası (PID değişince) yeniden kurulur;
+      gunicorn worker'ları master'ın soketlerini miras almaz
+    - Pool doluysa PoolError yerine timeout kadar boş bağlantı beklenir
+    - Checkout sayısı, bekleme/tutma süreleri ve tepe kullanım ölçülür;
+      debug modunda uzun süre tutulan her bağlantının çağrı yeri kaydedilir
+    """
+
+    def __init__(self, name, minconn, maxconn, **connect_kwargs):
+        self.name = name
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.connect_kwargs = connect_kwargs
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self._slots = None
+        self._reset_metrics()
+
+    # ---------- metrikler ----------
+    def _reset_metrics(self):
+        self._metrics_lock = threading.Lock()
+        self._held = {}  # id(conn) -> (checkout zamanı, thread adı, çağrı yeri)
+        self._metrics = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "peak_checked_out": 0,
+            "wait_total_ms": 0.0,
+            "wait_max_ms": 0.0,
+            "hold_total_ms": 0.0,
+            "hold_max_ms": 0.0,
+        }
+        self._last_leak_scan = time.monotonic()
+
+    def _record_checkout(self, conn, wait_ms):
+        call_site = None
+        if Config.DB_POOL_DEBUG:
+            # get_db / contextmanager çerçevelerini atla
+            call_site = "".join(traceback.format_stack(limit=10)[:-3]).strip()
+
+        with self._metrics_lock:
+            self._held[id(conn)] = (time.monotonic(), threading.current_thread().name, call_site)
+            m = self._metrics
+            m["checkouts"] += 1
+            m["wait_total_ms"] += wait_ms
+            m["wait_max_ms"] = max(m["wait_max_ms"], wait_ms)
+            m["peak_checked_out"] = max(m["peak_checked_out"], len(self._held))
+
+        if wait_ms > Config.DB_SLOW_CHECKOUT_MS:
+            logger.warning(f"🐢 {self.name} pool: bağlantı için {wait_ms:.0f} ms beklendi ({len(self._held)}/{self.maxconn} kullanımda)")
+
+        if time.monotonic() - self._last_leak_scan > Config.DB_LEAK_SECONDS:
+            self._last_leak_scan = time.monotonic()
+            self.log_leaks()
+
+    def _record_checkin(self, conn):
+        with self._metrics_lock:
+            entry = self._held.pop(id(conn), None)
+            if entry is None:
+                return
+            hold_ms = (time.monotonic() - entry[0]) * 1000
+            m = self._metrics
+            m["hold_total_ms"] += hold_ms
+            m["hold_max_ms"] = max(m["hold_max_ms"], hold_ms)
+
+    def find_leaks(self, threshold=None, call_sites=True):
+        """
+        threshold saniyeden uzun süredir geri verilmemiş bağlantılar
+
+        call_sites=False → stack trace'ler dahil edilmez (HTTP /metrics
+        herkese açık; çağrı yerleri sadece loglara yazılır)
+        """
+        if threshold is None:
+            threshold = Config.DB_LEAK_SECONDS
+        now = time.monotonic()
+        with self._metrics_lock:
+            held = list(self._held.values())
+
+        return [
+            {
+                "held_seconds": round(now - started, 1),
+                "thread": thread_name,
+                **({"call_site": call_site} if call_sites else {}),
+            }
+            for started, thread_name, call_site in held
+            if now - started > threshold
+        ]
+
+    def log_leaks(self, threshold=None):
+        leaks = self.find_leaks(threshold)
+        for leak in leaks:
+            logger.warning(
+                f"🚰 {self.name} pool: bağlantı {leak['held_seconds']}s'dir geri verilmedi "
+                f"(thread: {leak['thread']})\n{leak['call_site'] or '(çağrı yeri için DB_POOL_DEBUG=1)'}"
+            )
+        return leaks
+
+    def stats(self):
+        """Pool metrikleri (HTTP /metrics ve loglar için)"""
+        with self._metrics_lock:
+            m = dict(self._metrics)
+            checked_out = len(self._held)
+
+        checkouts = m["checkouts"]
+        returned = checkouts - checked_out
+        return {
+            "name": self.name,
+            "pid": self._pid,
+            "maxconn": self.maxconn,
+            "checked_out": checked_out,
+            "peak_checked_out": m["peak_checked_out"],
+            "checkouts": checkouts,
+            "timeouts": m["timeouts"],
+            "wait_avg_ms": round(m["wait_total_ms"] / checkouts, 2) if checkouts else 0.0,
+            "wait_max_ms": round(m["wait_max_ms"], 2),
+            "hold_avg_ms": round(m["hold_total_ms"] / returned, 2) if returned > 0 else 0.0,
+            "hold_max_ms": round(m["hold_max_ms"], 2),
+            "debug": Config.DB_POOL_DEBUG,
+        }
+
+    # ---------- pool ----------
+    def _ensure(self):
+        pid = os.getpid()
+        if self._pool is not None and self._pid == pid:
+            return self._pool
+
+        with self._lock:
+            if self._pool is not None and self._pid != pid:
+                logger.info(f"🔀 Fork algılandı, {self.name} pool yeniden kuruluyor (pid {pid})")
+                _inherited_pools.append(self._pool)
+                self._pool = None
+                self._reset_metrics()
+
+            if self._pool is None:
+                self._pool = ThreadedConnectionPool(self.minconn, self.maxconn, **self.connect_kwargs)
+                self._slots = threading.BoundedSemaphore(self.maxconn)
+                self._pid = pid
+                logger.info(f"✅ Database connection pool oluşturuldu ({self.name}: {self.minconn}-{self.maxconn} connection)")
+
+        return self._pool
+
+    def reset_after_fork(self):
+        """Child process'te eski pool'u kapatmadan bırak (os.register_at_fork)"""
+        if self._pool is not None:
+            _inherited_pools.append(self._pool)
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._reset_metrics()
+
+    def getconn(self, timeout):
+        pool = self._ensure()
+        slots = self._slots
+
+        started = time.monotonic()
+        if not slots.acquire(timeout=timeout):
+            with self._metrics_lock:
+                self._metrics["timeouts"] += 1
+            logger.error(f"❌ {self.name} pool tükendi ({self.maxconn}/{self.maxconn} kullanımda, {timeout}s beklendi)")
+            self.log_leaks(threshold=0)
+            raise PoolTimeout(f"{self.name} pool: {timeout}s içinde boş bağlantı yok (max {self.maxconn})")
+
+        try:
+            conn = pool.getconn()
+        except Exception:
+            slots.release()
+            raise
+
+        self._record_checkout(conn, (time.monotonic() - started) * 1000)
+        return conn
+
+    def putconn(self, conn):
+        if self._pool is None or self._pid != os.getpid():
+            # Fork öncesi alınmış bağlantı → bu process'in pool'una ait değil
+            return
+
+        self._record_checkin(conn)
+        try:
+            self._pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.closeall()
+            self._pool = None
+            self._pid = None
+
+
+db_pool = ConnectionPool(
+    "primary",
+    minconn=2,   # Minimum 2 connection (KuraBak ile aynı)
+    maxconn=20,  # Maximum 20 connection (KuraBak ile aynı)
+    user=DB_USER,
+    password=DB_PASSWORD,
+    host=DB_HOST,
+    port=DB_PORT,
+    database=DB_NAME
+)
+
 # ==========================================
-# CONNECTION POOL (2-20)
+# READ REPLICA (opsiyonel)
 # ==========================================
-try:
-    db_pool = SimpleConnectionPool(
-        minconn=2,   # Minimum 2 connection (KuraBak ile aynı)
-        maxconn=20,  # Maximum 20 connection (KuraBak ile aynı)
-        user=DB_USER,
-        password=DB_PASSWORD,
-        host=DB_HOST,
-        port=DB_PORT,
-        database=DB_NAME
+# Sadece okuma yapan API blueprint'leri replica'ya gider; ingestion servisleri
+# her zaman primary'ye yazar. Replica gecikmesi eşiği aşarsa veya replica'ya
+# ulaşılamazsa okumalar otomatik olarak primary'ye düşer.
+replica_pool = None
+
+if Config.DATABASE_REPLICA_URL:
+    replica_url = urlparse.urlparse(Config.DATABASE_REPLICA_URL)
+    replica_pool = ConnectionPool(
+        "replica",
+        minconn=1,
+        maxconn=Config.DB_REPLICA_MAXCONN,
+        user=replica_url.username,
+        password=replica_url.password,
+        host=replica_url.hostname,
+        port=replica_url.port,
+        database=replica_url.path[1:]
     )
-    logger.info("✅ Database connection pool oluşturuldu (2-20 connection)")
-except Exception as e:
-    logger.error(f"❌ Connection pool hatası: {e}")
-    db_pool = None
+    logger.info(f"📡 Read replica tanımlı (host: {replica_url.hostname})")
+
+
+class _ReplicaHealth:
+    """Replica gecikmesini periyodik ölçer, kullanılabilir mi karar verir"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked_at = 0.0
+        self.lag_seconds = None
+        self.healthy = False
+        self.error = None
+
+    def usable(self):
+        if time.monotonic() - self.checked_at > Config.REPLICA_LAG_CHECK_INTERVAL:
+            # Ölçümü tek thread yapar, diğerleri son bilinen duruma bakar
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._check()
+                finally:
+                    self._lock.release()
+        return self.healthy
+
+    def mark_failed(self, error):
+        self.healthy = False
+        self.error = str(error)
+        self.checked_at = time.monotonic()
+
+    def _check(self):
+        conn = None
+        try:
+            conn = replica_pool.getconn(Config.DB_POOL_TIMEOUT)
+            cur = conn.cursor()
+            # WAL'ın tamamı uygulanmışsa gecikme 0 (primary boştayken
+            # replay timestamp'i eskir ama replica aslında güncel)
+            cur.execute("""
+                SELECT CASE
+                    WHEN NOT pg_is_in_recovery() THEN 0
+                    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                END
+            """)
+            self.lag_seconds = float(cur.fetchone()[0])
+            cur.close()
+            conn.rollback()
+
+            was_healthy = self.healthy
+            self.healthy = self.lag_seconds <= Config.REPLICA_MAX_LAG_SECONDS
+            self.error = None
+            if was_healthy and not self.healthy:
+                logger.warning(f"⚠️ Replica gecikmesi {self.lag_seconds:.1f}s, okumalar primary'ye yönlendiriliyor")
+            elif self.healthy and not was_healthy:
+                logger.info(f"✅ Replica kullanılabilir (gecikme {self.lag_seconds:.1f}s)")
+        except Exception as e:
+            if self.healthy:
+                logger.warning(f"⚠️ Replica kontrol hatası, okumalar primary'ye yönlendiriliyor: {e}")
+            self.healthy = False
+            self.error = str(e)
+        finally:
+            if conn is not None:
+                replica_pool.putconn(conn)
+            self.checked_at = time.monotonic()
+
+    def stats(self):
+        return {
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": Config.REPLICA_MAX_LAG_SECONDS,
+            "error": self.error,
+        }
+
+
+replica_health = _ReplicaHealth()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=db_pool.reset_after_fork)
+    if replica_pool is not None:
+        os.register_at_fork(after_in_child=replica_pool.reset_after_fork)
 
 # ==========================================
 # PUBLIC METHODS
 # ==========================================
-def get_db():
-    """Pool'dan bağlantı al"""
-    if not db_pool:
-        raise Exception("Connection pool başlatılamadı!")
-    
-    return db_pool.getconn()
+def get_db(timeout=None):
+    """
+    Pool'dan bağlantı al (pool doluysa en fazla timeout saniye bekler)
+
+    Mümkünse db_connection() / db_cursor() context manager'larını kullan;
+    get_db ile alınan bağlantı mutlaka put_db ile geri verilmeli.
+    """
+    if timeout is None:
+        timeout = Config.DB_POOL_TIMEOUT
+
+    try:
+        return db_pool.getconn(timeout)
+    except PoolError:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Connection pool hatası: {e}")
+        raise Exception(f"Connection pool başlatılamadı! ({e})")
 
 def put_db(conn):
     """Bağlantıyı pool'a geri bırak"""
-    if db_pool and conn:
+    if conn:
         db_pool.putconn(conn)
 
+def replica_ok(*datasets):
+    """
+    Verilen dataset'ler için replica'dan okumak güvenli mi
+
+    Generation primary'deki commit'le birlikte ilerler; replica o an
+    REPLICA_MAX_LAG_SECONDS'a kadar geride olabilir. Yeni generation
+    altındaki ilk yüklemeler replica'dan okunursa eski veri yeni key altında
+    cache'lenir. Bu yüzden generation değiştikten sonraki
+    REPLICA_MAX_LAG_SECONDS boyunca okumalar primary'den yapılır.
+
+        with db_cursor(readonly=replica_ok('haberler')) as cursor: ...
+    """
+    if replica_pool is None:
+        return False
+    return all(generation_age(dataset) >= Config.REPLICA_MAX_LAG_SECONDS for dataset in datasets)
+
+def _checkout(timeout, readonly):
+    """→ (pool, conn); readonly ise mümkünse replica'dan"""
+    if timeout is None:
+        timeout = Config.DB_POOL_TIMEOUT
+
+    if readonly and replica_pool is not None and replica_health.usable():
+        try:
+            return replica_pool, replica_pool.getconn(timeout)
+        except Exception as e:
+            logger.warning(f"⚠️ Replica bağlantısı alınamadı, primary kullanılıyor: {e}")
+            replica_health.mark_failed(e)
+
+    return db_pool, get_db(timeout)
+
+@contextmanager
+def db_connection(timeout=None, readonly=False):
+    """
+    Bağlantıyı context manager ile al; hata olsa bile pool'a geri döner
+
+        with db_connection() as conn:
+            ...
+            conn.commit()
+
+    Exception durumunda açık transaction rollback edilir.
+
+    Args:
+        readonly: True ise (tanımlıysa ve gecikmesi eşik altındaysa) replica kullanılır
+    """
+    pool, conn = _checkout(timeout, readonly)
+    try:
+        yield conn
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        pool.putconn(conn)
+
+@contextmanager
+def db_cursor(commit=False, timeout=None, readonly=False):
+    """
+    Cursor'ı context manager ile al (bağlantı ve cursor her durumda kapanır)
+
+        with db_cursor() as cursor:
+            cursor.execute(...)
+
+    Args:
+        commit: True ise blok hatasız biterse commit edilir
+        readonly: True ise (mümkünse) replica'dan okunur
+    """
+    with db_connection(timeout, readonly) as conn:
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            if commit:
+                conn.commit()
+        finally:
+            cursor.close()
+
+def pool_stats():
+    """Pool metrikleri + eşik üstü tutulan bağlantılar"""
+    stats = db_pool.stats()
+    stats["leaks"] = db_pool.find_leaks(call_sites=False)
+
+    if replica_pool is not None:
+        replica = replica_pool.stats()
+        replica["leaks"] = replica_pool.find_leaks(call_sites=False)
+        replica.update(replica_health.stats())
+        stats["replica"] = replica
+
+    return stats
+
 def close_all_connections():
     """Tüm connection'ları kapat (shutdown sırasında)"""
-    if db_pool:
-        db_pool.closeall()
-        logger.info("🔌 Tüm database connection'ları kapatıldı")
+    db_pool.closeall()
+    if replica_pool is not None:
+        replica_pool.closeall()
+    logger.info("🔌 Tüm database connection'ları kapatıldı")
@@ -1,4 +1,4 @@
-from models.db import get_db, put_db
+from models.db import db_cursor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,33 +10,27 @@ logger = logging.getLogger(__name__)
 def create_gold_tables():
     """Altın tablolarını oluşturur (bir defaya mahsus)."""
     try:
-        conn = get_db()
-        cur = conn.cursor()
-
-        # Altın ana tablosu
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS golds (
-                name VARCHAR(80) PRIMARY KEY,
-                buying NUMERIC(15, 4),
-                selling NUMERIC(15, 4),
-                rate NUMERIC(15, 4),
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-
-        # Altın geçmiş tablosu
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS gold_history (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(80),
-                rate NUMERIC(15, 4),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-
-        conn.commit()
-        cur.close()
-        put_db(conn)
+        with db_cursor(commit=True) as cur:
+            # Altın ana tablosu
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS golds (
+                    name VARCHAR(80) PRIMARY KEY,
+                    buying NUMERIC(15, 4),
+                    selling NUMERIC(15, 4),
+                    rate NUMERIC(15, 4),
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+
+            # Altın geçmiş tablosu
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS gold_history (
+                    id SERIAL PRIMARY KEY,
+                    name VARCHAR(80),
+                    rate NUMERIC(15, 4),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
 
         logger.info("✅ Gold tabloları oluşturuldu.")
     except Exception as e:
@@ -50,18 +44,14 @@ def create_gold_tables():
 def get_all_golds():
     """Tüm altın fiyatlarını döndürür."""
     try:
-        conn = get_db()
-        cur = conn.cursor()
+        with db_cursor() as cur:
+            cur.execute("""
+                SELECT name, buying, selling, rate, updated_at
+                FROM golds
+                ORDER BY name ASC
+            """)
 
-        cur.execute("""
-            SELECT name, buying, selling, rate, updated_at
-            FROM golds
-            ORDER BY name ASC
-        """)
-
-        rows = cur.fetchall()
-        cur.close()
-        put_db(conn)
+            rows = cur.fetchall()
 
         result = []
         for row in rows:
@@ -83,20 +73,16 @@ def get_all_golds():
 def get_gold_history(name: str, limit: int = 50):
     """Bir altın türünün geçmiş fiyatlarını döndürür."""
     try:
-        conn = get_db()
-        cur = conn.cursor()
-
-        cur.execute("""
-            SELECT rate, created_at
-            FROM gold_history
-            WHERE name = %s
-            ORDER BY created_at DESC
-            LIMIT %s
-        """, (name, limit))
-
-        rows = cur.fetchall()
-        cur.close()
-        put_db(conn)
+        with db_cursor() as cur:
+            cur.execute("""
+                SELECT rate, created_at
+                FROM gold_history
+                WHERE name = %s
+                ORDER BY created_at DESC
+                LIMIT %s
+            """, (name, limit))
+
+            rows = cur.fetchall()
 
         return [
             {
@@ -0,0 +1,191 @@
+import logging
+from psycopg2.extras import execute_values
+from utils.cache import encode
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------
+# PİYASA TABLOLARI (döviz / altın / gümüş)
+# -------------------------------------------------------------
+
+# tablo → sembol kolonu
+MARKET_TABLES = {
+    'currencies': 'code',
+    'golds': 'name',
+    'silvers': 'name',
+}
+
+# tablo → sembolden sonra gelen değer kolonları (upsert sırası)
+VALUE_COLUMNS = {
+    'currencies': ['name', 'rate'],
+    'golds': ['buying', 'selling', 'rate'],
+    'silvers': ['buying', 'selling', 'rate'],
+}
+
+# tablo → geçmiş tablosu
+HISTORY_TABLES = {
+    'currencies': 'currency_history',
+    'golds': 'gold_history',
+    'silvers': 'silver_history',
+}
+
+# price_rollups çözünürlükleri (date_trunc birimleri, UTC)
+ROLLUP_RESOLUTIONS = ('hour', 'day')
+
+
+def fetch_market_rows(cursor, table_name, name_value=None):
+    """Tablonun API'de dönen satırlarını çeker (tek sembol veya tümü)."""
+    name_col = MARKET_TABLES[table_name]
+
+    if table_name in ['golds', 'silvers']:
+        select_cols = 'name, buying, selling, rate, COALESCE(change_percent, 0.0) as change_percent,'
+    else:
+        select_cols = 'code, name, rate, COALESCE(change_percent, 0.0) as change_percent,'
+
+    query = f'''
+        SELECT {select_cols}
+        to_char(updated_at, 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as updated_at
+        FROM {table_name}
+    '''
+
+    params = []
+    if name_value:
+        query += f" WHERE {name_col} = %s"
+        params.append(name_value)
+
+    query += f" ORDER BY {name_col}"
+
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+
+def encode_market_body(rows, single=False):
+    """API cevabını (success/count/data) JSON byte'larına çevirir."""
+    return encode({
+        'success': True,
+        'count': len(rows),
+        'data': rows[0] if single else rows
+    })
+
+
+def build_market_snapshot(cursor, table_name):
+    """
+    Tablonun "all" ve sembol bazlı cevaplarını hazırlar.
+
+    Returns:
+        {key_suffix: body} sözlüğü (publish_snapshot ile yayınlanır)
+    """
+    rows = fetch_market_rows(cursor, table_name)
+
+    snapshot = {'all': encode_market_body(rows)}
+    for row in rows:
+        snapshot[row[0]] = encode_market_body([row], single=True)
+
+    return snapshot
+
+
+def upsert_market_rows(cursor, table_name, rows):
+    """
+    Bir sağlayıcı cevabını TEK statement ile yazar.
+
+    - Tüm semboller tek VALUES listesiyle upsert edilir
+    - change_percent mevcut satıra göre veritabanında hesaplanır
+    - Geçmiş run-length tutulur: kur değişmediyse sembolün son geçmiş
+      satırının valid_until / tick_count alanları uzatılır, değiştiyse
+      (veya son gözlemden bu yana HISTORY_MAX_GAP_MINUTES geçtiyse)
+      yeni satır eklenir
+    - price_rollups'ta saatlik / günlük OHLC kovaları artımlı güncellenir
+
+    Sembol sayısından bağımsız olarak sabit sayıda round trip.
+
+    Args:
+        rows: [(sembol, *VALUE_COLUMNS[table_name])] listesi
+
+    Returns:
+        Yazılan sembol sayısı
+    """
+    name_col = MARKET_TABLES[table_name]
+    value_cols = VALUE_COLUMNS[table_name]
+    history_table = HISTORY_TABLES[table_name]
+
+    # Aynı sembol iki kez gelirse ON CONFLICT hata verir → sonuncusu kazanır
+    unique_rows = list({row[0]: row for row in rows}.values())
+    if not unique_rows:
+        return 0
+
+    columns = [name_col] + value_cols
+    col_list = ', '.join(columns)
+    template = '(' + ', '.join(
+        '%s' if col in ('code', 'name') else '%s::float8' for col in columns
+    ) + ')'
+    updates = ',\n'.join(f'                {col} = EXCLUDED.{col}' for col in value_cols)
+    max_gap = int(Config.HISTORY_MAX_GAP_MINUTES)
+
+    result = execute_values(cursor, f'''
+        WITH incoming ({col_list}) AS (VALUES %s),
+        upserted AS (
+            INSERT INTO {table_name} AS t ({col_list}, change_percent, updated_at)
+            SELECT {col_list}, 0, CURRENT_TIMESTAMP FROM incoming
+            ON CONFLICT ({name_col}) DO UPDATE SET
+{updates},
+                change_percent = CASE
+                    WHEN t.rate > 0 THEN (EXCLUDED.rate - t.rate) / t.rate * 100
+                    ELSE 0
+                END,
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING {name_col}, rate
+        ),
+        last_run AS (
+            SELECT u.{name_col}, u.rate, h.id, h.created_at,
+                   (h.rate = u.rate AND COALESCE(h.valid_until, h.created_at)
+                        >= CURRENT_TIMESTAMP - make_interval(mins => {max_gap})) AS unchanged
+            FROM upserted u
+            LEFT JOIN LATERAL (
+                SELECT id, rate, created_at, valid_until
+                FROM {history_table}
+                WHERE {name_col} = u.{name_col}
+                ORDER BY created_at DESC
+                LIMIT 1
+            ) h ON TRUE
+        ),
+        extended AS (
+            UPDATE {history_table} h
+            SET valid_until = CURRENT_TIMESTAMP,
+                tick_count = h.tick_count + 1
+            FROM last_run l
+            WHERE l.unchanged AND h.id = l.id AND h.created_at = l.created_at
+            RETURNING h.id
+        ),
+        inserted AS (
+            INSERT INTO {history_table} ({name_col}, rate, created_at, valid_until, tick_count)
+            SELECT {name_col}, rate, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 1
+            FROM last_run
+            WHERE unchanged IS NOT TRUE
+            RETURNING id
+        ),
+        rolled AS (
+            INSERT INTO price_rollups AS p
+                (dataset, symbol, resolution, bucket, open, high, low, close, ticks, first_at, last_at)
+            SELECT '{table_name}', u.{name_col}, r.resolution,
+                   date_trunc(r.resolution, CURRENT_TIMESTAMP, 'UTC'),
+                   u.rate, u.rate, u.rate, u.rate, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+            FROM upserted u
+            CROSS JOIN unnest(ARRAY{list(ROLLUP_RESOLUTIONS)}::text[]) AS r(resolution)
+            ON CONFLICT (dataset, symbol, resolution, bucket) DO UPDATE SET
+                high = GREATEST(p.high, EXCLUDED.high),
+                low = LEAST(p.low, EXCLUDED.low),
+                close = EXCLUDED.close,
+                ticks = p.ticks + 1,
+                last_at = EXCLUDED.last_at
+            RETURNING 1
+        )
+        SELECT (SELECT count(*) FROM upserted),
+               (SELECT count(*) FROM extended),
+               (SELECT count(*) FROM inserted)
+    ''', unique_rows, template=template, page_size=len(unique_rows), fetch=True)
+
+    written, extended, inserted = result[0]
+    logger.debug(f"{history_table}: {inserted} yeni satır, {extended} satır uzatıldı")
+
+    return written
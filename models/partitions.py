@@ -0,0 +1,202 @@
+import logging
+from datetime import datetime, timezone
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------
+# AYLIK PARTITION'LI GEÇMİŞ TABLOLARI
+# -------------------------------------------------------------
+# currency_history / gold_history / silver_history created_at'e göre aylık
+# range partition'lıdır: {tablo}_p202410 → [2024-10-01, 2024-11-01) UTC.
+#   - (sembol, created_at) index'i parent'ta tanımlı, her partition'a iner
+#   - Sorgular sadece ilgili ayların partition'larına gider (pruning)
+#   - Saklama süresi dolan ay DETACH + DROP ile tek adımda silinir
+#     (DELETE yok, vacuum borcu yok)
+# Gelecek aylar init_db ve haftalık bakımda önceden açılır.
+
+
+def _month_start(year, month):
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def _add_months(dt, months):
+    index = dt.year * 12 + (dt.month - 1) + months
+    return _month_start(index // 12, index % 12 + 1)
+
+
+def _partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def _is_partitioned(cursor, table):
+    """→ True (partitioned), False (düz tablo), None (yok)"""
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return row[0] == 'p'
+
+
+def _create_parent(cursor, table, name_col):
+    cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {table}_id_seq;")
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id BIGINT NOT NULL DEFAULT nextval('{table}_id_seq'),
+            {name_col} VARCHAR(100),
+            rate FLOAT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            valid_until TIMESTAMPTZ,
+            tick_count INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{name_col}_created ON {table}({name_col}, created_at);")
+
+
+def create_partitions(cursor, table, start, end):
+    """start ayından end ayına kadar (dahil) eksik partition'ları oluştur"""
+    month = _month_start(start.year, start.month)
+    last = _month_start(end.year, end.month)
+    created = 0
+
+    while month <= last:
+        name = _partition_name(table, month)
+        cursor.execute("SELECT to_regclass(%s)", (name,))
+        if cursor.fetchone()[0] is None:
+            cursor.execute(f"""
+                CREATE TABLE {name} PARTITION OF {table}
+                FOR VALUES FROM (%s) TO (%s)
+            """, (month, _add_months(month, 1)))
+            created += 1
+        month = _add_months(month, 1)
+
+    if created:
+        logger.info(f"🗂 {table}: {created} yeni partition")
+    return created
+
+
+def _migrate_legacy(cursor, table, name_col):
+    """Düz (partition'sız) eski tabloyu partition'lı tabloya taşı"""
+    legacy = f"{table}_legacy"
+    logger.info(f"🗂 {table} partition'lı tabloya taşınıyor...")
+
+    cursor.execute(f"ALTER TABLE {table} RENAME TO {legacy};")
+    cursor.execute("SELECT 1 FROM pg_constraint WHERE conname = %s", (f"{table}_pkey",))
+    if cursor.fetchone():
+        cursor.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey;")
+    cursor.execute(f"DROP INDEX IF EXISTS idx_{table}_{name_col}_created;")
+    # Eski SERIAL sekansı yeni tabloda devam eder (id'ler çakışmaz)
+    cursor.execute(f"ALTER SEQUENCE IF EXISTS {table}_id_seq OWNED BY NONE;")
+
+    _create_parent(cursor, table, name_col)
+
+    cursor.execute(f"SELECT min(created_at), max(created_at) FROM {legacy}")
+    oldest, newest = cursor.fetchone()
+    now = datetime.now(timezone.utc)
+    create_partitions(cursor, table, oldest or now, max(newest or now, now))
+
+    cursor.execute(f"""
+        INSERT INTO {table} (id, {name_col}, rate, created_at, valid_until, tick_count)
+        SELECT id, {name_col}, rate, COALESCE(created_at, CURRENT_TIMESTAMP), valid_until, tick_count
+        FROM {legacy}
+    """)
+    moved = cursor.rowcount
+    cursor.execute(f"DROP TABLE {legacy};")
+    logger.info(f"✅ {table}: {moved} satır taşındı")
+
+
+def ensure_history_table(cursor, table, name_col):
+    """
+    Geçmiş tablosunu partition'lı olarak hazırla
+
+    Yoksa oluşturur, eski düz tablo ise taşır, ardından bu ay ve
+    HISTORY_PARTITIONS_AHEAD ay sonrası için partition'ları açar.
+    """
+    state = _is_partitioned(cursor, table)
+
+    if state is None:
+        _create_parent(cursor, table, name_col)
+    elif state is False:
+        # Eski şema: run-length kolonları yoksa ekle, sonra taşı
+        cursor.execute(f"""
+            ALTER TABLE {table}
+                ADD COLUMN IF NOT EXISTS valid_until TIMESTAMPTZ,
+                ADD COLUMN IF NOT EXISTS tick_count INTEGER NOT NULL DEFAULT 1;
+        """)
+        _migrate_legacy(cursor, table, name_col)
+
+    cursor.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id;")
+
+    now = datetime.now(timezone.utc)
+    create_partitions(cursor, table, now, _add_months(now, Config.HISTORY_PARTITIONS_AHEAD))
+
+
+def _carry_over_runs(cursor, table, name_col, partition, cutoff):
+    """
+    Silinecek partition'da başlayıp cutoff'tan sonraya uzanan run'ları böl
+
+    Run'ın cutoff sonrası tick'leri (eşit aralıklı tick modeliyle, bkz.
+    /history raw) ilk kalan tick'ten başlayan yeni satır olarak parent'a
+    yazılır; böylece uzun süre değişmeyen bir kurun saklama penceresindeki
+    geçmişi partition'la birlikte silinmez.
+    """
+    cursor.execute(f"""
+        INSERT INTO {table} ({name_col}, rate, created_at, valid_until, tick_count)
+        SELECT {name_col}, rate,
+               created_at + make_interval(secs => skipped * step),
+               valid_until, tick_count - skipped
+        FROM (
+            SELECT {name_col}, rate, created_at, valid_until, tick_count, step,
+                   ceil(extract(epoch FROM %(cutoff)s - created_at) / step)::int AS skipped
+            FROM (
+                SELECT *, extract(epoch FROM valid_until - created_at) / (tick_count - 1) AS step
+                FROM {partition}
+                WHERE valid_until >= %(cutoff)s AND tick_count > 1
+            ) r
+        ) s
+    """, {'cutoff': cutoff})
+    return cursor.rowcount
+
+
+def drop_expired_partitions(cursor, table, name_col, retention_months):
+    """
+    Tamamı saklama süresinin dışında kalan ayları DETACH + DROP et
+
+    Partition önce DETACH edilir (transaction sonuna kadar yeni tick'ler
+    bekler), içinden saklama penceresine uzanan run'lar parent'a bölünerek
+    taşınır, sonra DROP edilir.
+
+    Returns:
+        Silinen partition sayısı
+    """
+    cutoff = _add_months(datetime.now(timezone.utc), -retention_months)
+    cutoff_name = _partition_name(table, cutoff)
+
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        ORDER BY c.relname
+    """, (table,))
+
+    # {tablo}_pYYYYMM isimleri kronolojik sıralanır; cutoff ayı dahil kalır
+    expired = [name for (name,) in cursor.fetchall() if name < cutoff_name]
+    if not expired:
+        return 0
+
+    # Bölünen run'ların yeni satırları cutoff'tan bugüne bir ayda başlar
+    cutoff = _month_start(cutoff.year, cutoff.month)
+    create_partitions(cursor, table, cutoff, datetime.now(timezone.utc))
+
+    dropped = 0
+    carried = 0
+    for name in expired:
+        cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name};")
+        carried += _carry_over_runs(cursor, table, name_col, name, cutoff)
+        cursor.execute(f"DROP TABLE {name};")
+        dropped += 1
+
+    logger.info(f"🗑️ {table}: {dropped} eski partition silindi ({carried} run bölündü)")
+    return dropped
@@ -1,4 +1,4 @@
-from models.db import get_db, put_db
+from models.db import db_cursor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,33 +10,27 @@ logger = logging.getLogger(__name__)
 def create_silver_tables():
     """Gümüş tablolarını oluşturur (bir defaya mahsus çalıştırılabilir)."""
     try:
-        conn = get_db()
-        cur = conn.cursor()
-
-        # Ana gümüş tablosu
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS silvers (
-                name VARCHAR(50) PRIMARY KEY,
-                buying NUMERIC(15, 4),
-                selling NUMERIC(15, 4),
-                rate NUMERIC(15, 4),
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-
-        # Gümüş geçmiş tablosu
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS silver_history (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(50),
-                rate NUMERIC(15, 4),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-
-        conn.commit()
-        cur.close()
-        put_db(conn)
+        with db_cursor(commit=True) as cur:
+            # Ana gümüş tablosu
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS silvers (
+                    name VARCHAR(50) PRIMARY KEY,
+                    buying NUMERIC(15, 4),
+                    selling NUMERIC(15, 4),
+                    rate NUMERIC(15, 4),
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+
+            # Gümüş geçmiş tablosu
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS silver_history (
+                    id SERIAL PRIMARY KEY,
+                    name VARCHAR(50),
+                    rate NUMERIC(15, 4),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
 
         logger.info("✅ Silver tabloları oluşturuldu.")
     except Exception as e:
@@ -50,17 +44,13 @@ def create_silver_tables():
 def get_all_silvers():
     """Veritabanındaki son gümüş fiyatlarını döndürür."""
     try:
-        conn = get_db()
-        cur = conn.cursor()
+        with db_cursor() as cur:
+            cur.execute("""
+                SELECT name, buying, selling, rate, updated_at
+                FROM silvers
+            """)
 
-        cur.execute("""
-            SELECT name, buying, selling, rate, updated_at
-            FROM silvers
-        """)
-
-        rows = cur.fetchall()
-        cur.close()
-        put_db(conn)
+            rows = cur.fetchall()
 
         result = []
         for row in rows:
@@ -82,20 +72,16 @@ def get_all_silvers():
 def get_silver_history(name: str = "Gümüş", limit: int = 50):
     """Gümüş geçmiş fiyat hareketlerini döndürür."""
     try:
-        conn = get_db()
-        cur = conn.cursor()
-
-        cur.execute("""
-            SELECT rate, created_at
-            FROM silver_history
-            WHERE name = %s
-            ORDER BY created_at DESC
-            LIMIT %s
-        """, (name, limit))
-
-        rows = cur.fetchall()
-        cur.close()
-        put_db(conn)
+        with db_cursor() as cur:
+            cur.execute("""
+                SELECT rate, created_at
+                FROM silver_history
+                WHERE name = %s
+                ORDER BY created_at DESC
+                LIMIT %s
+            """, (name, limit))
+
+            rows = cur.fetchall()
 
         return [
             {
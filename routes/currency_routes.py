@@ -1,121 +1,360 @@
+import math
+import numpy as np
 from flask import Blueprint, jsonify, request
-from models.db import get_db, put_db
+from models.db import db_cursor, replica_ok
+from models.market_models import ROLLUP_RESOLUTIONS, fetch_market_rows, encode_market_body
 from datetime import datetime, timedelta
-from utils.cache import get_cache, set_cache
+from config import Config
+from utils.cache import get_or_load, dataset_key, encode
+from utils.http_cache import cached_response
+from utils.analytics import summarize
+from services import tick_store
+from services.cross_rates import cross_rates, matrix_key
 
 currency_bp = Blueprint('currency', __name__, url_prefix='/api/currency')
 
+# /history interval değerleri: ham tick'ler + rollup çözünürlükleri
+HISTORY_INTERVALS = ('raw',) + ROLLUP_RESOLUTIONS
+
+# history tablo prefix'i → cache dataset'i
+HISTORY_DATASETS = {
+    'currency': 'currencies',
+    'gold': 'golds',
+    'silver': 'silvers',
+}
+
 
 def _get_data(table_name, name_col, name_value=None):
     """Veritabanından döviz/altın/gümüş verilerini çeker (CACHE DESTEKLİ)"""
 
-    # CACHE KEY
-    cache_key = f"{table_name}_{name_value or 'all'}"
+    if name_value and name_col == 'code':
+        name_value = name_value.upper()
 
-    # 60 saniyelik RAM CACHE
-    cached = get_cache(cache_key, 60)
-    if cached is not None:
-        return jsonify({
-            'success': True,
-            'count': len(cached) if isinstance(cached, list) else 1,
-            'data': cached
-        }), 200
+    # CACHE KEY → nouvsapp:currencies:g42:all, nouvsapp:golds:g7:Gram Altın ...
+    cache_key = dataset_key(table_name, name_value or 'all')
 
-    # Cache yoksa DB'den oku
-    try:
-        conn = get_db()
-        cursor = conn.cursor()
+    def load():
+        with db_cursor(readonly=replica_ok(table_name)) as cursor:
+            data = fetch_market_rows(cursor, table_name, name_value)
 
-        # 🔥 YENİ: change_percent kolonu da çekiliyor
-        if table_name in ['golds', 'silvers']:
-            select_cols = 'name, buying, selling, rate, COALESCE(change_percent, 0.0) as change_percent,'
-            name_alias = 'name'
-        else:
-            select_cols = 'code, name, rate, COALESCE(change_percent, 0.0) as change_percent,'
-            name_alias = 'code'
+        if name_value and not data:
+            return None
 
-        query = f'''
-            SELECT {select_cols}
-            to_char(updated_at, 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as updated_at
-            FROM {table_name}
-        '''
+        # Cevabı bir kez JSON'a çevir
+        return encode_market_body(data, single=bool(name_value))
 
-        params = []
-        if name_value:
-            query += f" WHERE {name_col} = %s"
-            params.append(name_value.upper() if name_col == 'code' else name_value)
+    try:
+        # Local LRU → paylaşılan cache → (key başına tek) DB sorgusu
+        body = get_or_load(cache_key, load)
 
-        query += f" ORDER BY {name_alias}"
+        if body is None:
+            return jsonify({'success': False, 'message': f'{name_value} bulunamadı'}), 404
 
-        cursor.execute(query, params)
-        data = cursor.fetchall()
+        return cached_response(cache_key, body, Config.FINANCE_MAX_AGE, Config.FINANCE_STALE_WHILE_REVALIDATE)
 
-        cursor.close()
-        put_db(conn)
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
 
-        if name_value and not data:
-            return jsonify({'success': False, 'message': f'{name_value} bulunamadı'}), 404
 
-        # Cache'e yaz
-        set_cache(cache_key, data if not name_value else data[0])
 
-        return jsonify({
-            'success': True,
-            'count': len(data),
-            'data': data[0] if name_value else data
-        }), 200
+def _history_max_days(interval):
+    """Çözünürlük başına izin verilen en uzun aralık (gün)"""
+    return {
+        'raw': Config.TICK_STORE_DAYS,
+        'hour': Config.ROLLUP_HOURLY_RETENTION_DAYS,
+    }.get(interval, Config.HISTORY_MAX_DAYS)
 
-    except Exception as e:
-        return jsonify({'success': False, 'message': str(e)}), 500
 
+def _history_interval(days):
+    """interval parametresi yoksa aralığa göre çözünürlük seç"""
+    if days <= Config.HISTORY_RAW_MAX_DAYS:
+        return 'raw'
+    if days <= Config.HISTORY_HOURLY_MAX_DAYS:
+        return 'hour'
+    return 'day'
 
 
 def _get_history(table_name, name_col, name_value):
-    """Geçmiş verilerini çeker"""
+    """
+    Geçmiş verilerini çeker
+
+    interval=raw: ham tick'ler (son TICK_STORE_DAYS gün bellekten), hour/day:
+    price_rollups OHLC kovaları (rate = kapanış). Verilmezse days'e göre
+    otomatik seçilir. days 1..HISTORY_MAX_DAYS aralığına sıkıştırılır; raw ve
+    hour için daha uzun aralıklar 400 döner.
+    """
     try:
         days = request.args.get('days', 7, type=int)
+        days = max(1, min(days, Config.HISTORY_MAX_DAYS))
         since = datetime.utcnow() - timedelta(days=days)
+        interval = request.args.get('interval') or _history_interval(days)
 
-        conn = get_db()
-        cursor = conn.cursor()
-
-        cursor.execute(f'''
-            SELECT {name_col} as name_code, rate,
-            to_char(created_at, 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as timestamp
-            FROM {table_name}_history 
-            WHERE {name_col} = %s AND created_at >= %s
-            ORDER BY created_at ASC
-        ''', (name_value.upper() if name_col == 'code' else name_value, since))
-
-        history = cursor.fetchall()
-        cursor.close()
-        put_db(conn)
+        if interval not in HISTORY_INTERVALS:
+            return jsonify({
+                'success': False,
+                'message': f"interval şunlardan biri olmalı: {', '.join(HISTORY_INTERVALS)}"
+            }), 400
 
-        if not history:
+        if days > _history_max_days(interval):
+            return jsonify({
+                'success': False,
+                'message': f"interval={interval} için days en fazla {_history_max_days(interval)} olabilir"
+            }), 400
+
+        if name_col == 'code':
+            name_value = name_value.upper()
+
+        dataset = HISTORY_DATASETS[table_name]
+        cache_key = dataset_key(dataset, 'history', name_value, days, interval)
+
+        def load_raw(cursor):
+            # Run-length satırlar tick başına noktaya açılır: tick_count
+            # tick, created_at ile valid_until arasına eşit aralıklı
+            # (RunBuffer.points ile aynı kural). created_at üzerinde alt sınır
+            # olmasa tüm aylık partition'lar taranır: pencereye sadece since
+            # sonrası başlayan run'lar + öncesinde başlayıp içine uzanan son
+            # run girebilir
+            cursor.execute(f'''
+                WITH h AS (
+                    SELECT * FROM (
+                        SELECT {name_col}, rate, created_at, valid_until, tick_count
+                        FROM {table_name}_history
+                        WHERE {name_col} = %(name)s AND created_at < %(since)s
+                        ORDER BY created_at DESC
+                        LIMIT 1
+                    ) prev
+                    UNION ALL
+                    SELECT {name_col}, rate, created_at, valid_until, tick_count
+                    FROM {table_name}_history
+                    WHERE {name_col} = %(name)s AND created_at >= %(since)s
+                )
+                SELECT h.{name_col} as name_code, h.rate,
+                to_char(p.ts, 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as timestamp
+                FROM h
+                CROSS JOIN LATERAL generate_series(0, h.tick_count - 1) AS k(i)
+                CROSS JOIN LATERAL (SELECT CASE
+                    WHEN h.tick_count > 1 THEN h.created_at
+                        + (COALESCE(h.valid_until, h.created_at) - h.created_at) * (k.i::float8 / (h.tick_count - 1))
+                    ELSE h.created_at
+                END AS ts) p
+                WHERE COALESCE(h.valid_until, h.created_at) >= %(since)s
+                  AND p.ts >= %(since)s
+                ORDER BY p.ts ASC
+            ''', {'name': name_value, 'since': since})
+            return cursor.fetchall()
+
+        def load_rollup(cursor):
+            # Kova başına tek satır: [name_code, close, bucket, open, high, low]
+            cursor.execute('''
+                SELECT symbol as name_code, close as rate,
+                to_char(bucket, 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as timestamp,
+                open, high, low
+                FROM price_rollups
+                WHERE dataset = %s AND symbol = %s AND resolution = %s
+                  AND bucket >= date_trunc(%s, %s::timestamptz, 'UTC')
+                ORDER BY bucket ASC
+            ''', (dataset, name_value, interval, interval, since))
+            return cursor.fetchall()
+
+        def load():
+            # Pencere içindeki raw sorgular worker içi tick deposundan
+            history = tick_store.query(dataset, name_value, since) if interval == 'raw' else None
+
+            if history is None:
+                with db_cursor(readonly=replica_ok(dataset)) as cursor:
+                    history = load_raw(cursor) if interval == 'raw' else load_rollup(cursor)
+
+            if not history:
+                return None
+
+            return encode({
+                'success': True,
+                'name_code': name_value,
+                'interval': interval,
+                'count': len(history),
+                'data': history
+            })
+
+        body = get_or_load(cache_key, load, Config.HISTORY_CACHE_TIMEOUT)
+
+        if body is None:
             return jsonify({
                 'success': False,
                 'message': f'No history found for {name_value}',
                 'data': []
             }), 404
 
-        return jsonify({
-            'success': True,
-            'name_code': name_value,
-            'count': len(history),
-            'data': history
-        }), 200
+        return cached_response(cache_key, body, Config.HISTORY_MAX_AGE)
 
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
 
+def _get_analytics(table_name, name_col, name_value):
+    """
+    Kapanış serisi üzerinde SMA / EMA / volatilite / yüksek-düşük / değişim
+
+    days (varsayılan ANALYTICS_DEFAULT_DAYS) ≤ ANALYTICS_HOURLY_MAX_DAYS ise
+    saatlik, üstü günlük kovalar; windows=24,168 kova cinsinden pencereler.
+    Sonuç generation başına bir kez hesaplanır.
+    """
+    try:
+        days = request.args.get('days', Config.ANALYTICS_DEFAULT_DAYS, type=int)
+        days = max(1, min(days, Config.ANALYTICS_MAX_DAYS))
+        interval = 'hour' if days <= Config.ANALYTICS_HOURLY_MAX_DAYS else 'day'
+
+        # Aralıktaki kova sayısından uzun pencere anlamsız (ve EMA ağırlıkları taşar)
+        max_window = days * 24 if interval == 'hour' else days
+
+        windows = request.args.get('windows')
+        try:
+            windows = (tuple(int(w) for w in windows.split(','))
+                       if windows else Config.ANALYTICS_WINDOWS[interval])
+        except ValueError:
+            windows = ()
+        # Varsayılan pencereler kısa aralıklarda kova sayısını aşabilir (None döner)
+        max_window = max(max_window, *Config.ANALYTICS_WINDOWS[interval])
+        if (not windows or len(windows) > Config.ANALYTICS_MAX_WINDOWS
+                or min(windows) < 1 or max(windows) > max_window):
+            return jsonify({
+                'success': False,
+                'message': f'windows 1-{Config.ANALYTICS_MAX_WINDOWS} adet, 1 ile {max_window} '
+                           f'arasında tam sayı olmalı (interval={interval})'
+            }), 400
+
+        if name_col == 'code':
+            name_value = name_value.upper()
+
+        dataset = HISTORY_DATASETS[table_name]
+        since = datetime.utcnow() - timedelta(days=days)
+        cache_key = dataset_key(dataset, 'analytics', name_value, days,
+                                ','.join(str(w) for w in windows))
+
+        def load():
+            with db_cursor(readonly=replica_ok(dataset)) as cursor:
+                cursor.execute('''
+                    SELECT close
+                    FROM price_rollups
+                    WHERE dataset = %s AND symbol = %s AND resolution = %s
+                      AND bucket >= date_trunc(%s, %s::timestamptz, 'UTC')
+                    ORDER BY bucket ASC
+                ''', (dataset, name_value, interval, interval, since))
+                closes = [row[0] for row in cursor.fetchall()]
+
+            if not closes:
+                return None
+
+            return encode({
+                'success': True,
+                'name_code': name_value,
+                'interval': interval,
+                'days': days,
+                'count': len(closes),
+                **summarize(closes, windows)
+            })
+
+        body = get_or_load(cache_key, load, Config.HISTORY_CACHE_TIMEOUT)
+
+        if body is None:
+            return jsonify({
+                'success': False,
+                'message': f'No history found for {name_value}'
+            }), 404
+
+        return cached_response(cache_key, body, Config.HISTORY_MAX_AGE)
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+
+def _parse_symbols(value):
+    return [s.strip() for s in value.split(',') if s.strip()] if value else []
+
+
 # ================== ENDPOINTS ==================
 
 @currency_bp.route('/all', methods=['GET'])
 def get_all_currencies():
     return _get_data('currencies', 'code')
 
+@currency_bp.route('/convert', methods=['GET'])
+def convert():
+    """?from=USD&to=EUR&amount=100 (döviz kodu, altın / gümüş adı veya TRY)"""
+    try:
+        source = request.args.get('from', '').strip()
+        target = request.args.get('to', '').strip()
+
+        if not source or not target:
+            return jsonify({'success': False, 'message': 'from ve to parametreleri gerekli'}), 400
+
+        try:
+            amount = float(request.args.get('amount', 1))
+        except ValueError:
+            amount = math.nan
+        if not math.isfinite(amount):
+            return jsonify({'success': False, 'message': 'amount sayı olmalı'}), 400
+
+        rates = cross_rates()
+        i, j = rates.lookup(source), rates.lookup(target)
+        missing = [name for name, idx in ((source, i), (target, j)) if idx is None]
+        if missing:
+            return jsonify({'success': False, 'message': f"{', '.join(missing)} bulunamadı"}), 404
+
+        rate = rates.rate(i, j)
+        return jsonify({
+            'success': True,
+            'from': rates.symbols[i],
+            'to': rates.symbols[j],
+            'amount': amount,
+            'rate': rate,
+            'result': amount * rate,
+            'updated_at': rates.updated_at
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@currency_bp.route('/matrix', methods=['GET'])
+def get_matrix():
+    """
+    Tüm çapraz kurlar: rates[i][j] = 1 birim symbols[i] kaç birim symbols[j]
+
+    ?symbols=USD,EUR,Gram Altın ile alt küme
+    """
+    try:
+        rates = cross_rates()
+        requested = _parse_symbols(request.args.get('symbols'))
+
+        if requested:
+            indexes = [rates.lookup(symbol) for symbol in requested]
+            missing = [symbol for symbol, idx in zip(requested, indexes) if idx is None]
+            if missing:
+                return jsonify({'success': False, 'message': f"{', '.join(missing)} bulunamadı"}), 404
+        else:
+            indexes = list(range(len(rates.symbols)))
+
+        symbols = [rates.symbols[i] for i in indexes]
+        cache_key = matrix_key(rates, *symbols) if requested else matrix_key(rates, 'all')
+
+        def load():
+            return encode({
+                'success': True,
+                'base': 'TRY',
+                'updated_at': rates.updated_at,
+                'symbols': symbols,
+                'rates': rates.matrix[np.ix_(indexes, indexes)].tolist()
+            })
+
+        # Build başına bir kez JSON'a çevrilir
+        body = get_or_load(cache_key, load)
+
+        return cached_response(cache_key, body, Config.FINANCE_MAX_AGE, Config.FINANCE_STALE_WHILE_REVALIDATE)
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @currency_bp.route('/<code>', methods=['GET'])
 def get_currency(code):
     return _get_data('currencies', 'code', code)
@@ -124,6 +363,10 @@ def get_currency(code):
 def get_currency_history(code):
     return _get_history('currency', 'code', code)
 
+@currency_bp.route('/analytics/<code>', methods=['GET'])
+def get_currency_analytics(code):
+    return _get_analytics('currency', 'code', code)
+
 
 @currency_bp.route('/gold/all', methods=['GET'])
 def get_all_golds():
@@ -137,6 +380,10 @@ def get_gold(name):
 def get_gold_history(name):
     return _get_history('gold', 'name', name)
 
+@currency_bp.route('/gold/analytics/<name>', methods=['GET'])
+def get_gold_analytics(name):
+    return _get_analytics('gold', 'name', name)
+
 
 @currency_bp.route('/silver/all', methods=['GET'])
 def get_all_silvers():
@@ -149,3 +396,7 @@ def get_silver(name):
 @currency_bp.route('/silver/history/<name>', methods=['GET'])
 def get_silver_history(name):
     return _get_history('silver', 'name', name)
+
+@currency_bp.route('/silver/analytics/<name>', methods=['GET'])
+def get_silver_analytics(name):
+    return _get_analytics('silver', 'name', name)
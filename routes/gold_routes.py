@@ -1,9 +1,9 @@
 from flask import Blueprint
-from services.gold_service import fetch_golds
+from services.budget import run_manual
 
 gold_bp = Blueprint("gold", __name__)
 
 @gold_bp.route("/golds/update", methods=["GET"])
 def update_golds():
-    ok = fetch_golds()
-    return {"success": ok}
+    result = run_manual("golds")
+    return {"success": result["ok"], "status": result["status"]}
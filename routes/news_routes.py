@@ -1,41 +1,157 @@
 from flask import Blueprint, jsonify, request
 from datetime import datetime
-from models.db import get_db, put_db
-from services.news_service import haberleri_cek
+from models.db import db_cursor, replica_ok
+from services.budget import run_manual
 from config import Config
+from utils.cache import get_or_load, dataset_key, encode
+from utils.http_cache import cached_response
+from utils.pagination import InvalidCursor, decode_cursor, page_limit, paginate
 
 news_bp = Blueprint('news', __name__, url_prefix='/api')
 
 
-@news_bp.route('/haberler', methods=['GET'])
-def get_haberler():
-    try:
-        limit = request.args.get('limit', 100, type=int)
-
-        conn = get_db()
-        cursor = conn.cursor()
+def _haber_sayfasi(filtre, filtre_params, default_limit, cache_parts, extra):
+    """
+    (tarih, id) üzerinde keyset sayfalı haber listesi
 
-        cursor.execute('''
-            SELECT id, baslik, aciklama, gorsel, kaynak, url, kategori,
-            to_char(tarih, 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as tarih
-            FROM haberler
-            WHERE kaynak = ANY(%s)
-            ORDER BY tarih DESC
-            LIMIT %s
-        ''', (Config.ALLOWED_SOURCES, limit))
+    Varsayılan olarak her yakın kopya kümesinden (kume_id) tek haber döner:
+    filtreye uyan, kümesinin en yeni haberi. ?tekil=0 ile tüm haberler.
 
-        haberler = cursor.fetchall()
+    Args:
+        filtre: Ek WHERE koşulu, tablo takma adı için {t} (kaynak filtresine AND ile eklenir) veya ''
+        filtre_params: filtre'nin parametreleri
+        default_limit: limit verilmezse sayfa boyutu
+        cache_parts: dataset_key parçaları (sadece ilk sayfa cache'lenir)
+        extra: Cevaba eklenecek alanlar
+    """
+    limit = page_limit(request.args.get('limit', type=int), default_limit, Config.NEWS_MAX_PAGE_SIZE)
+    cursor_token = request.args.get('cursor')
+    tekil = request.args.get('tekil', 1, type=int) != 0
 
-        cursor.close()
-        put_db(conn)
-
-        return jsonify({
+    try:
+        after = decode_cursor(cursor_token, 2)
+    except InvalidCursor as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    def kosul(t):
+        return f'{t}.kaynak = ANY(%s)' + (' AND ' + filtre.format(t=t) if filtre else '')
+
+    def load():
+        where = kosul('h')
+        params = [Config.ALLOWED_SOURCES, *filtre_params]
+        if tekil:
+            # Kümenin filtreye uyan daha yeni bir haberi varsa bu satırı atla
+            where += f''' AND NOT EXISTS (
+                    SELECT 1 FROM haberler n
+                    WHERE n.kume_id = h.kume_id AND (n.tarih, n.id) > (h.tarih, h.id)
+                      AND {kosul('n')}
+                )'''
+            params.extend([Config.ALLOWED_SOURCES, *filtre_params])
+        if after:
+            where += ' AND (h.tarih, h.id) < (%s::timestamptz, %s)'
+            params.extend(after)
+        params.append(limit + 1)
+
+        with db_cursor(readonly=replica_ok('haberler')) as cursor:
+            cursor.execute(f'''
+                SELECT id, baslik, aciklama, gorsel, kaynak, url, kategori,
+                to_char(tarih, 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as tarih, kategoriler,
+                tarih AS cursor_tarih, id AS cursor_id
+                FROM haberler h
+                WHERE {where}
+                ORDER BY h.tarih DESC, h.id DESC
+                LIMIT %s
+            ''', params)
+
+            rows = cursor.fetchall()
+
+        haberler, next_cursor = paginate(rows, limit, 2)
+        return encode({
             'success': True,
+            **extra,
             'count': len(haberler),
             'sources': Config.ALLOWED_SOURCES,
-            'haberler': haberler
+            'haberler': haberler,
+            'next_cursor': next_cursor
         })
 
+    # Sadece ilk sayfa cache'lenir; devamı composite index'ten sabit maliyetle okunur
+    cache_key = dataset_key('haberler', *cache_parts, limit, int(tekil), cursor_token or '')
+    if after:
+        body = load()
+    else:
+        body = get_or_load(cache_key, load, Config.NEWS_CACHE_TIMEOUT)
+    return cached_response(cache_key, body, Config.NEWS_MAX_AGE, Config.NEWS_STALE_WHILE_REVALIDATE)
+
+
+@news_bp.route('/haberler', methods=['GET'])
+def get_haberler():
+    try:
+        return _haber_sayfasi('', [], 100, ['list'], {})
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@news_bp.route('/haberler/search', methods=['GET'])
+def search_haberler():
+    """Başlık + açıklamada tam metin arama (ts_rank sıralı, cursor sayfalamalı)"""
+    try:
+        q = ' '.join(request.args.get('q', '').split())[:Config.NEWS_SEARCH_MAX_QUERY_LENGTH]
+        if not q:
+            return jsonify({'success': False, 'error': 'q parametresi gerekli'}), 400
+
+        limit = page_limit(request.args.get('limit', type=int),
+                           Config.NEWS_SEARCH_DEFAULT_LIMIT, Config.NEWS_SEARCH_MAX_LIMIT)
+        cursor_token = request.args.get('cursor')
+
+        try:
+            after = decode_cursor(cursor_token, 2)
+        except InvalidCursor as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        def load():
+            params = {'q': q, 'sources': Config.ALLOWED_SOURCES, 'limit': limit + 1}
+            keyset = ''
+            if after:
+                keyset = 'WHERE (sonuc.rank, sonuc.id) < (%(rank)s::float8, %(id)s)'
+                params.update(rank=after[0], id=after[1])
+
+            with db_cursor(readonly=replica_ok('haberler')) as cursor:
+                cursor.execute(f'''
+                    SELECT id, baslik, aciklama, gorsel, kaynak, url, kategori, tarih, kategoriler,
+                    rank AS cursor_rank, id AS cursor_id
+                    FROM (
+                        SELECT id, baslik, aciklama, gorsel, kaynak, url, kategori,
+                        to_char(tarih, 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as tarih, kategoriler,
+                        ts_rank(arama, query)::float8 as rank
+                        FROM haberler, websearch_to_tsquery('turkish', %(q)s) query
+                        WHERE arama @@ query AND kaynak = ANY(%(sources)s)
+                    ) sonuc
+                    {keyset}
+                    ORDER BY sonuc.rank DESC, sonuc.id DESC
+                    LIMIT %(limit)s
+                ''', params)
+
+                rows = cursor.fetchall()
+
+            haberler, next_cursor = paginate(rows, limit, 2)
+            return encode({
+                'success': True,
+                'q': q,
+                'count': len(haberler),
+                'haberler': haberler,
+                'next_cursor': next_cursor
+            })
+
+        # Sadece ilk sayfa cache'lenir (popüler aramalar); devamı doğrudan index'ten
+        cache_key = dataset_key('haberler', 'search', q.lower(), limit, cursor_token or '')
+        if after:
+            body = load()
+        else:
+            body = get_or_load(cache_key, load, Config.NEWS_CACHE_TIMEOUT)
+        return cached_response(cache_key, body, Config.NEWS_MAX_AGE)
+
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -43,23 +159,27 @@ def get_haberler():
 @news_bp.route('/haber/<int:haber_id>', methods=['GET'])
 def get_haber_detay(haber_id):
     try:
-        conn = get_db()
-        cursor = conn.cursor()
+        def load():
+            with db_cursor(readonly=replica_ok('haberler')) as cursor:
+                cursor.execute('''
+                    SELECT id, baslik, aciklama, gorsel, kaynak, url, kategori,
+                    to_char(tarih, 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as tarih, kategoriler
+                    FROM haberler
+                    WHERE id = %s AND kaynak = ANY(%s)
+                ''', (haber_id, Config.ALLOWED_SOURCES))
 
-        cursor.execute('''
-            SELECT id, baslik, aciklama, gorsel, kaynak, url, kategori,
-            to_char(tarih, 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as tarih
-            FROM haberler
-            WHERE id = %s AND kaynak = ANY(%s)
-        ''', (haber_id, Config.ALLOWED_SOURCES))
+                haber = cursor.fetchone()
 
-        haber = cursor.fetchone()
+            if not haber:
+                return None
 
-        cursor.close()
-        put_db(conn)
+            return encode({'success': True, 'haber': haber})
 
-        if haber:
-            return jsonify({'success': True, 'haber': haber})
+        cache_key = dataset_key('haberler', 'haber', haber_id)
+        body = get_or_load(cache_key, load, Config.NEWS_CACHE_TIMEOUT)
+
+        if body:
+            return cached_response(cache_key, body, Config.NEWS_MAX_AGE, Config.NEWS_STALE_WHILE_REVALIDATE)
         else:
             return jsonify({'success': False, 'error': 'Haber bulunamadı'}), 404
 
@@ -70,32 +190,7 @@ def get_haber_detay(haber_id):
 @news_bp.route('/kategori/<kategori>', methods=['GET'])
 def get_kategori_haberleri(kategori):
     try:
-        limit = request.args.get('limit', 50, type=int)
-
-        conn = get_db()
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT id, baslik, aciklama, gorsel, kaynak, url, kategori,
-            to_char(tarih, 'YYYY-MM-DD"T"HH24:MI:SS"Z"') as tarih
-            FROM haberler
-            WHERE kategori = %s AND kaynak = ANY(%s)
-            ORDER BY tarih DESC
-            LIMIT %s
-        ''', (kategori, Config.ALLOWED_SOURCES, limit))
-
-        haberler = cursor.fetchall()
-
-        cursor.close()
-        put_db(conn)
-
-        return jsonify({
-            'success': True,
-            'kategori': kategori,
-            'count': len(haberler),
-            'sources': Config.ALLOWED_SOURCES,
-            'haberler': haberler
-        })
+        return _haber_sayfasi('{t}.kategoriler @> ARRAY[%s]::text[]', [kategori], 50, ['kategori', kategori], {'kategori': kategori})
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -103,10 +198,12 @@ def get_kategori_haberleri(kategori):
 
 @news_bp.route('/cek-haberler', methods=['GET', 'POST', 'HEAD'])
 def cek_haberler_manual():
-    result = haberleri_cek()
+    sonuc = run_manual('haberler')
+    result = sonuc['result'] or 0
 
     return jsonify({
-        'success': True,
+        'success': sonuc['ok'],
+        'status': sonuc['status'],
         'message': f'{result} haber eklendi',
         'eklenen': result,
         'timestamp': datetime.now().isoformat()
@@ -1,9 +1,9 @@
 from flask import Blueprint
-from services.silver_service import fetch_silvers
+from services.budget import run_manual
 
 silver_bp = Blueprint("silver", __name__)
 
 @silver_bp.route("/silvers/update", methods=["GET"])
 def update_silvers():
-    ok = fetch_silvers()
-    return {"success": ok}
+    result = run_manual("silvers")
+    return {"success": result["ok"], "status": result["status"]}
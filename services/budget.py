@@ -0,0 +1,209 @@
+import os
+import time
+import logging
+import threading
+from config import Config
+from utils import cache
+from utils.quota import daily_quota, remaining, seconds_until_reset
+from services.currency_service import fetch_currencies
+from services.gold_service import fetch_golds
+from services.silver_service import fetch_silvers
+from services.news_service import haberleri_cek
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# KOTA BÜTÇELİ UPSTREAM İŞLERİ
+# ==========================================
+# Sabit aralık yerine her iş BUDGET_TICK_SECONDS'ta bir "sıra geldi mi" diye
+# bakar. Hedef aralık, sağlayıcının bugün kalan kotası gün sonuna kadar
+# işlerin ağırlıklarına göre paylaştırılarak hesaplanır:
+#
+#   aralık = kalan_süre / (harcanabilir_kota * ağırlık_payı / çağrı_sayısı)
+#
+# ve min_interval'dan kısa olamaz. Kotanın QUOTA_MANUAL_RESERVE kadarı manuel
+# tetiklemelere ayrılır. Son çalışma zamanı ve iş kilidi paylaşılan cache'te
+# durur: her gunicorn worker'ının scheduler'ı aynı işi tekrar çalıştırmaz,
+# manuel tetiklemeler yakın zamanda yapılmış bir çalışmaya katılır.
+
+
+class BudgetedJob:
+    """Kotası olan bir sağlayıcıya giden zamanlanmış iş"""
+
+    def __init__(self, name, fn, provider, calls_per_run, weight, min_interval):
+        self.name = name
+        self.fn = fn
+        self.provider = provider
+        self.calls_per_run = calls_per_run
+        self.weight = weight
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+
+
+# Ağırlık: aynı sağlayıcının kotasından alınan pay (en değerli yenileme en sık)
+JOBS = {
+    "haberler": BudgetedJob("haberler", haberleri_cek, "newsapi",
+                            calls_per_run=3, weight=1, min_interval=1800),
+    "currencies": BudgetedJob("currencies", fetch_currencies, "collectapi",
+                              calls_per_run=1, weight=3, min_interval=600),
+    "golds": BudgetedJob("golds", fetch_golds, "collectapi",
+                         calls_per_run=1, weight=2, min_interval=600),
+    "silvers": BudgetedJob("silvers", fetch_silvers, "collectapi",
+                           calls_per_run=1, weight=1, min_interval=600),
+}
+
+# Backend yoksa worker içi son çalışma bilgisi
+_local_state = {}
+
+
+# ---------- paylaşılan durum ----------
+def _state_key(name):
+    return cache.make_key("jobs", name)
+
+
+def _last_state(name):
+    """Son çalışma → {"at", "ok", "result", "manual"} or None"""
+    if cache.backend:
+        try:
+            data = cache.backend.get(_state_key(name))
+            return cache.decode(data) if data else None
+        except Exception as e:
+            logger.error(f"❌ İş durumu okunamadı ({name}): {e}")
+    return _local_state.get(name)
+
+
+def _save_state(name, state):
+    _local_state[name] = state
+    if cache.backend:
+        try:
+            cache.backend.set(_state_key(name), cache.encode(state), 2 * 86400 * 1000)
+        except Exception as e:
+            logger.error(f"❌ İş durumu yazılamadı ({name}): {e}")
+
+
+def _age(state):
+    return time.time() - state["at"] if state else float("inf")
+
+
+# ---------- bütçe ----------
+def target_interval(job):
+    """
+    İşin şu anki hedef aralığı (saniye)
+
+    Returns:
+        Saniye; harcanabilir kota bir çalışmaya yetmiyorsa None
+    """
+    left = remaining(job.provider)
+    if left is None:
+        return job.min_interval
+
+    spendable = left - daily_quota(job.provider) * Config.QUOTA_MANUAL_RESERVE
+    if spendable < job.calls_per_run:
+        return None
+
+    total_weight = sum(j.weight for j in JOBS.values() if j.provider == job.provider)
+    runs = spendable * (job.weight / total_weight) / job.calls_per_run
+    if runs < 1:
+        return None
+
+    return max(job.min_interval, seconds_until_reset() / runs)
+
+
+def _execute(job, manual=False):
+    """İşi worker'lar arası tek kopya olarak çalıştır ve sonucu kaydet"""
+    if not job._lock.acquire(blocking=False):
+        return _running(job)
+
+    lock_key = cache.make_key("jobs", job.name, "lock")
+    token = f"{os.getpid()}:{threading.get_ident()}:{time.monotonic()}"
+    locked = True
+
+    try:
+        if cache.backend:
+            try:
+                locked = cache.backend.acquire_lock(lock_key, token, Config.JOB_LOCK_SECONDS * 1000)
+            except Exception as e:
+                logger.error(f"❌ İş kilidi hatası ({job.name}): {e}")
+        if not locked:
+            return _running(job)
+
+        try:
+            result = job.fn()
+            ok = result is not False
+        except Exception as e:
+            logger.error(f"❌ {job.name} işi hata verdi: {e}")
+            result, ok = None, False
+
+        _save_state(job.name, {"at": time.time(), "ok": ok, "result": result, "manual": manual})
+        return {"ok": ok, "result": result, "status": "ran"}
+
+    finally:
+        if cache.backend and locked:
+            try:
+                cache.backend.release_lock(lock_key, token)
+            except Exception as e:
+                logger.error(f"❌ İş kilidi bırakılamadı ({job.name}): {e}")
+        job._lock.release()
+
+
+def _running(job):
+    """İş başka bir thread / worker'da çalışıyor → son bilinen sonuç"""
+    state = _last_state(job.name) or {}
+    return {"ok": state.get("ok", True), "result": state.get("result"), "status": "running"}
+
+
+# ---------- giriş noktaları ----------
+def run_scheduled(name):
+    """Scheduler tick'i: hedef aralık dolduysa işi çalıştır"""
+    job = JOBS[name]
+
+    interval = target_interval(job)
+    if interval is None:
+        logger.warning(f"⏸ {name}: {job.provider} kotası tükeniyor, zamanlanmış çalışma atlandı")
+        return None
+
+    # Yarım tick tolerans: 600s'lik iş 60s tick ile 659s'ye kaymasın
+    if _age(_last_state(name)) < interval - Config.BUDGET_TICK_SECONDS / 2:
+        return None
+
+    return _execute(job)
+
+
+def run_manual(name):
+    """
+    Manuel tetikleme (/api/update, /golds/update ...)
+
+    Yakın zamanda başarılı bir çalışma varsa upstream'e gitmeden onun
+    sonucunu döner; kota bitmişse çalıştırmaz.
+
+    Returns:
+        {"ok", "result", "status": "ran" | "coalesced" | "running" | "quota"}
+    """
+    job = JOBS[name]
+
+    state = _last_state(name)
+    if state and state["ok"] and _age(state) < Config.MANUAL_COALESCE_SECONDS:
+        logger.info(f"♻️ {name}: {int(_age(state))}s önceki çalışma kullanıldı")
+        return {"ok": True, "result": state["result"], "status": "coalesced"}
+
+    left = remaining(job.provider)
+    if left is not None and left < job.calls_per_run:
+        logger.warning(f"⛔ {name}: {job.provider} günlük kotası doldu")
+        return {"ok": False, "result": None, "status": "quota"}
+
+    return _execute(job, manual=True)
+
+
+def budget_stats():
+    """İş başına son çalışma ve şu anki hedef aralık"""
+    stats = {}
+    for name, job in JOBS.items():
+        state = _last_state(name) or {}
+        interval = target_interval(job)
+        stats[name] = {
+            "provider": job.provider,
+            "last_run_age": round(_age(state)) if state else None,
+            "last_ok": state.get("ok"),
+            "target_interval": round(interval) if interval else None,
+        }
+    return stats
@@ -0,0 +1,117 @@
+import time
+import logging
+import threading
+import numpy as np
+from models.db import db_cursor, replica_ok
+from models.market_models import MARKET_TABLES
+from config import Config
+from utils.cache import generation, make_key
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# ÇAPRAZ KUR MATRİSİ
+# ==========================================
+# Döviz, altın ve gümüş fiyatları TRY cinsinden tutulur; istisnalar
+# (Config.PRICE_QUOTE_CURRENCIES, örn. USD cinsinden ons) build sırasında
+# o para biriminin TRY fiyatıyla çarpılarak TRY'ye çevrilir. p TRY fiyat
+# vektörüyse N x N matris:
+#
+#   M[i, j] = p[i] / p[j]   (1 birim i kaç birim j eder)
+#
+# Matris worker içinde tutulur ve üç dataset'ten birinin generation'ı
+# değiştiğinde (yeni tick) bir kez, tek sorgu + tek NumPy işlemiyle yeniden
+# kurulur. Dönüşüm bir indeks araması: DB'ye gidilmez.
+
+
+class CrossRates:
+    """Bir build'in sembolleri, indeksi ve matrisi"""
+
+    def __init__(self, symbols, prices, updated_at, version):
+        self.symbols = symbols
+        self.index = {symbol: i for i, symbol in enumerate(symbols)}
+        self.matrix = prices[:, None] / prices[None, :]
+        self.updated_at = updated_at
+        self.version = version
+
+    def lookup(self, symbol):
+        """Sembolün indeksi (döviz kodları büyük/küçük harf duyarsız) or None"""
+        i = self.index.get(symbol)
+        if i is None:
+            i = self.index.get(symbol.upper())
+        return i
+
+    def rate(self, source, target):
+        return float(self.matrix[source, target])
+
+
+_lock = threading.Lock()
+_current = None
+
+
+def _version():
+    return tuple(generation(dataset) for dataset in MARKET_TABLES)
+
+
+def _build(version):
+    started = time.perf_counter()
+    parts = [
+        f"""SELECT {name_col}, rate, to_char(updated_at, 'YYYY-MM-DD"T"HH24:MI:SS"Z"')
+            FROM {table} WHERE rate > 0"""
+        for table, name_col in MARKET_TABLES.items()
+    ]
+
+    with db_cursor(readonly=replica_ok(*MARKET_TABLES)) as cursor:
+        cursor.execute(" UNION ALL ".join(parts))
+        rows = cursor.fetchall()
+
+    # TRY fiyat tablosunda yoksa da baz olarak matriste bulunur
+    prices = {'TRY': 1.0}
+    updated_at = None
+    for symbol, rate, updated in rows:
+        prices[symbol] = float(rate)
+        if updated is not None and (updated_at is None or updated > updated_at):
+            updated_at = updated
+
+    # TRY dışı fiyatları çevir; kuru yoksa sembol matrise girmez
+    for symbol, quote in Config.PRICE_QUOTE_CURRENCIES.items():
+        if symbol not in prices:
+            continue
+        if quote in prices:
+            prices[symbol] *= prices[quote]
+        else:
+            logger.warning(f"⚠️ {symbol}: {quote} kuru yok, çapraz kur matrisine alınmadı")
+            del prices[symbol]
+
+    symbols = sorted(prices)
+    rates = CrossRates(
+        symbols,
+        np.fromiter((prices[s] for s in symbols), dtype=np.float64, count=len(symbols)),
+        updated_at,
+        version,
+    )
+
+    logger.debug(f"💱 Çapraz kur matrisi: {len(symbols)}x{len(symbols)} "
+                 f"({(time.perf_counter() - started) * 1000:.0f}ms)")
+    return rates
+
+
+def cross_rates():
+    """Güncel matris (generation değiştiyse yeniden kurulur)"""
+    global _current
+
+    version = _version()
+    current = _current
+    if current is not None and current.version == version:
+        return current
+
+    with _lock:
+        if _current is None or _current.version != version:
+            _current = _build(version)
+        return _current
+
+
+def matrix_key(rates, *parts):
+    """Matris cevaplarının (ETag varyantı) key'i: build'in generation'larına bağlı"""
+    version = ".".join(f"g{gen}" for gen in rates.version)
+    return make_key("cross_rates", version, *parts)
@@ -2,7 +2,10 @@ import logging
 import psycopg2
 from datetime import datetime, timedelta
 from config import Config
-from models.db import get_db, put_db
+from models.db import get_db, put_db, db_cursor
+from models.market_models import MARKET_TABLES, HISTORY_TABLES
+from models.partitions import ensure_history_table, drop_expired_partitions
+from utils.cache import invalidate, DATASETS
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +27,7 @@ def cleanup_old_data():
         # Temizlenecek tablolar
         tables = ['currencies', 'golds', 'silvers', 'haberler', 'news']
         total_deleted = 0
+        changed = []
         
         for table in tables:
             # Tablo var mı kontrol et
@@ -50,9 +54,15 @@ def cleanup_old_data():
             
             if deleted > 0:
                 logger.info(f"🗑️ {table}: {deleted} eski kayıt silindi")
+                if table in DATASETS:
+                    changed.append(table)
         
         conn.commit()
         
+        # Sadece değişen dataset'lerin cache'i geçersiz (generation += 1)
+        if changed:
+            invalidate(*changed)
+        
         if total_deleted > 0:
             logger.info(f"✅ Toplam {total_deleted} eski kayıt temizlendi (30+ gün öncesi)")
         else:
@@ -72,6 +82,36 @@ def cleanup_old_data():
         if conn:
             put_db(conn)
 
+def maintain_history_partitions():
+    """
+    Geçmiş tabloları: gelecek ayların partition'larını aç, saklama süresi
+    dolan ayları DETACH + DROP et; eski saatlik OHLC kovalarını sil
+    """
+    try:
+        dropped = 0
+        
+        with db_cursor(commit=True) as cur:
+            for table_name, history_table in HISTORY_TABLES.items():
+                ensure_history_table(cur, history_table, MARKET_TABLES[table_name])
+                dropped += drop_expired_partitions(
+                    cur, history_table, MARKET_TABLES[table_name], Config.HISTORY_RETENTION_MONTHS
+                )
+            
+            # Saatlik OHLC kovaları (günlükler uzun vadeli grafikler için kalır)
+            cur.execute("""
+                DELETE FROM price_rollups
+                WHERE resolution = 'hour' AND bucket < %s
+            """, (datetime.now() - timedelta(days=Config.ROLLUP_HOURLY_RETENTION_DAYS),))
+            if cur.rowcount > 0:
+                logger.info(f"🗑️ price_rollups: {cur.rowcount} saatlik kova silindi")
+        
+        logger.info(f"✅ Geçmiş partition bakımı tamamlandı ({dropped} partition silindi)")
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Partition bakım hatası: {e}")
+        return False
+
 def optimize_database():
     """
     Veritabanını optimize et - VACUUM ANALYZE
@@ -87,7 +127,7 @@ def optimize_database():
         cur = conn.cursor()
         
         # Optimize edilecek tablolar
-        tables = ['currencies', 'golds', 'silvers', 'haberler', 'news']
+        tables = ['currencies', 'golds', 'silvers', 'haberler', 'news', 'price_rollups']
         
         for table in tables:
             # Tablo var mı kontrol et
@@ -122,6 +162,7 @@ def optimize_database():
 def weekly_maintenance():
     """
     Haftalık bakım - Eski verileri temizle ve veritabanını optimize et
+    (cache sadece veri silinen dataset'ler için cleanup_old_data içinde geçersiz kılınır)
     Her Pazar sabahı 04:00'te çalışır
     """
     logger.info("🔧 Haftalık bakım başlıyor...")
@@ -129,18 +170,13 @@ def weekly_maintenance():
     # 1. Önce eski verileri temizle
     cleanup_success = cleanup_old_data()
     
-    # 2. Sonra veritabanını optimize et
-    optimize_success = optimize_database()
+    # 2. Geçmiş tabloları: yeni aylar + süresi dolan partition'lar
+    partition_success = maintain_history_partitions()
     
-    # 3. Cache'i temizle
-    try:
-        from utils.cache import clear_cache
-        clear_cache("nouvsapp:*")
-        logger.info("🗑️ Redis cache temizlendi")
-    except Exception as e:
-        logger.warning(f"⚠️ Cache temizleme hatası: {e}")
+    # 3. Sonra veritabanını optimize et
+    optimize_success = optimize_database()
     
-    if cleanup_success and optimize_success:
+    if cleanup_success and partition_success and optimize_success:
         logger.info("✅ Haftalık bakım başarıyla tamamlandı")
     else:
         logger.warning("⚠️ Haftalık bakım kısmen tamamlandı (bazı işlemler başarısız)")
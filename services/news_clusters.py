@@ -0,0 +1,161 @@
+import time
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from psycopg2.extras import execute_values
+from config import Config
+from utils.minhash import MinHasher, LSHIndex, from_bytes, to_bytes
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# HABER KÜMELEME (YAKIN KOPYALAR)
+# ==========================================
+# NTV / CNN Türk / HaberTürk aynı haberi farklı başlıklarla verir. Her yeni
+# haberin başlık + açıklamasından MinHash imzası çıkarılır, worker içindeki
+# LSH index'inde benzeri aranır:
+#   - benzer (>= NEWS_CLUSTER_THRESHOLD) → onun kume_id'si
+#   - yoksa kendi url_hash'i yeni kümenin kume_id'si olur
+# İmza haberler.minhash'te saklanır; index ilk kullanımda DB'den ısınır
+# (imzası olmayan eski satırların imzası hesaplanıp yazılır), sonra sadece
+# son görülen id'nin NEWS_CLUSTER_ID_OVERLAP altından itibaren (başka
+# worker'ın ekledikleri; daha düşük id'yle geç commit edilenler dahil)
+# güncellenir ve saklama penceresinden düşen haberler index'ten çıkar.
+# Yani her çalışmanın maliyeti pencere büyüklüğüne değil yeni haber sayısına bağlı.
+
+_hasher = MinHasher(num_perm=Config.NEWS_MINHASH_PERMUTATIONS)
+
+_lock = threading.Lock()
+_index = None
+_kumeler = {}    # url_hash → (kume_id, tarih)
+_son_id = 0
+
+
+def _metin(satir):
+    baslik, aciklama = satir[0], satir[1]
+    return f"{baslik} {aciklama or ''}"
+
+
+def _yeni_index():
+    bands = Config.NEWS_MINHASH_PERMUTATIONS // Config.NEWS_LSH_ROWS
+    return LSHIndex(bands=bands, rows=Config.NEWS_LSH_ROWS)
+
+
+def _imzasizlari_doldur(cursor):
+    """
+    minhash'i olmayan (kolon eklenmeden önce yazılmış) pencere içi haberlerin
+    imzasını hesapla, index'e ekle ve DB'ye yaz
+    """
+    sinir = datetime.now(timezone.utc) - timedelta(days=Config.NEWS_RETENTION_DAYS)
+    cursor.execute('''
+        SELECT url_hash::text, kume_id::text, baslik, aciklama, tarih
+        FROM haberler
+        WHERE minhash IS NULL AND url_hash IS NOT NULL AND tarih >= %s
+    ''', (sinir,))
+
+    guncellenecek = []
+    for url_hash, kume_id, baslik, aciklama, tarih in cursor.fetchall():
+        imza = _hasher.signature(_metin((baslik, aciklama)))
+        if imza is None:
+            continue
+        _index.add(url_hash, imza)
+        _kumeler[url_hash] = (kume_id or url_hash, tarih)
+        guncellenecek.append((url_hash, kume_id or url_hash, to_bytes(imza)))
+
+    if guncellenecek:
+        execute_values(cursor, '''
+            UPDATE haberler h
+            SET minhash = v.minhash, kume_id = COALESCE(h.kume_id, v.kume_id)
+            FROM (VALUES %s) AS v(url_hash, kume_id, minhash)
+            WHERE h.url_hash = v.url_hash AND h.minhash IS NULL
+        ''', guncellenecek, template="(%s::uuid, %s::uuid, %s::bytea)", page_size=500)
+        logger.info(f"🧩 {len(guncellenecek)} eski haberin MinHash imzası dolduruldu")
+
+
+def _guncelle(cursor):
+    """Index'i DB ile eşitle: yeni satırları ekle, pencereden düşenleri çıkar"""
+    global _index, _son_id
+
+    if _index is None:
+        _index = _yeni_index()
+        _kumeler.clear()
+        _son_id = 0
+        _imzasizlari_doldur(cursor)
+
+    started = time.perf_counter()
+    cursor.execute('''
+        SELECT id, url_hash::text, kume_id::text, minhash, tarih
+        FROM haberler
+        WHERE id > %s AND minhash IS NOT NULL
+        ORDER BY id
+    ''', (max(_son_id - Config.NEWS_CLUSTER_ID_OVERLAP, 0),))
+
+    eklenen = 0
+    for haber_id, url_hash, kume_id, minhash, tarih in cursor.fetchall():
+        _son_id = max(_son_id, haber_id)
+        if url_hash in _index:
+            continue
+        _index.add(url_hash, from_bytes(minhash))
+        _kumeler[url_hash] = (kume_id or url_hash, tarih)
+        eklenen += 1
+
+    sinir = datetime.now(timezone.utc) - timedelta(days=Config.NEWS_RETENTION_DAYS)
+    eskiler = [h for h, (_, tarih) in _kumeler.items() if tarih is not None and tarih < sinir]
+    for url_hash in eskiler:
+        _index.remove(url_hash)
+        del _kumeler[url_hash]
+
+    if eklenen or eskiler:
+        logger.debug(f"🧩 Küme index'i: +{eklenen} / -{len(eskiler)} "
+                     f"({len(_index)} haber, {(time.perf_counter() - started) * 1000:.0f}ms)")
+
+
+def kumeleri_ata(cursor, satirlar):
+    """
+    Satırlara kume_id ve minhash ekler
+
+    Args:
+        cursor: Aktif transaction'ın cursor'ı (index'i DB ile eşitlemek için)
+        satirlar: news_service._haber_satirlari çıktısı (url_hash 6. kolon)
+
+    Returns:
+        [(*satir, kume_id, minhash_bytes or None)]
+    """
+    with _lock:
+        _guncelle(cursor)
+
+        sonuc = []
+        birlesen = 0
+        for satir in satirlar:
+            url_hash, tarih = satir[5], satir[8]
+
+            # Zaten bilinen haber (ON CONFLICT ile güncellenecek) → kümesi aynı kalır
+            if url_hash in _kumeler:
+                sonuc.append((*satir, _kumeler[url_hash][0], None))
+                continue
+
+            imza = _hasher.signature(_metin(satir))
+            if imza is None:
+                sonuc.append((*satir, url_hash, None))
+                continue
+
+            benzer, _ = _index.best_match(imza, Config.NEWS_CLUSTER_THRESHOLD)
+            kume_id = _kumeler[benzer][0] if benzer else url_hash
+            if benzer:
+                birlesen += 1
+
+            # Aynı batch'teki sonraki haberler de bu haberi bulabilsin
+            _index.add(url_hash, imza)
+            _kumeler[url_hash] = (kume_id, tarih)
+            sonuc.append((*satir, kume_id, to_bytes(imza)))
+
+        if birlesen:
+            logger.info(f"🧩 {birlesen} haber mevcut bir kümeye eklendi")
+        return sonuc
+
+
+def sifirla():
+    """Transaction geri alındıysa index DB'den yeniden kurulsun"""
+    global _index
+    with _lock:
+        _index = None
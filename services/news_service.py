@@ -1,108 +1,226 @@
-import requests
-from datetime import datetime, timedelta
+import uuid
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from datetime import datetime, timedelta, timezone
 import logging
 from config import Config
-from models.db import get_db, put_db
+from psycopg2.extras import execute_values
+from models.db import get_db, put_db, db_cursor
+from utils.cache import invalidate, make_key, get_cache_bytes, set_cache_bytes
+from utils.http_client import get_json
+from utils.parallel import run_parallel
+from services.news_clusters import kumeleri_ata, sifirla
 
 logger = logging.getLogger(__name__)
 
+# Normalize URL'den atılan izleme parametreleri
+_IZLEME_ONEKLERI = ("utm_", "mc_")
+_IZLEME_PARAMETRELERI = {"fbclid", "gclid", "yclid", "ref", "cmpid"}
+
+# Son kaydedilen NewsAPI cevabının parmak izi (tüm worker'lar için)
+_PARMAK_IZI_KEY = make_key("haberler", "fingerprint")
+
+def _kategori_cek(kategori):
+    """Tek kategorinin haberlerini NewsAPI'den çeker (hata → boş liste)."""
+    response = get_json(
+        "newsapi",
+        "https://newsapi.org/v2/top-headlines",
+        params={
+            "country": "tr",
+            "category": kategori,
+            "apiKey": Config.NEWS_API_KEY
+        }
+    )
+    
+    if not response.ok:
+        return []
+    
+    return response.data.get("articles", [])
+
+def _normalize_url(url):
+    """
+    Aynı haberin farklı URL yazımlarını tek biçime indirger:
+    şema/host küçük harf, "www." ve #fragment atılır, utm_* gibi izleme
+    parametreleri silinir, kalan parametreler sıralanır, sondaki "/" atılır.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_IZLEME_ONEKLERI) and k.lower() not in _IZLEME_PARAMETRELERI
+    )
+    path = parts.path.rstrip("/") or "/"
+    
+    return urlunsplit((parts.scheme.lower(), host, path, urlencode(query), ""))
+
+def _url_hash(url):
+    """Normalize URL'in md5'i → UUID (16 byte, sabit genişlikte unique key)"""
+    return str(uuid.UUID(hashlib.md5(_normalize_url(url).encode("utf-8")).hexdigest()))
+
+def _haber_satirlari(kategori_haberleri):
+    """
+    NewsAPI makalelerini INSERT satırlarına çevirir (url_hash ile tekil)
+
+    Aynı haber birden çok kategoride gelirse tek satır olur, kategoriler
+    birleştirilir; kategori kolonu ilk geldiği kategoridir.
+
+    Args:
+        kategori_haberleri: {kategori: [makale]} (çekilme sırasıyla)
+    """
+    satirlar = {}
+    
+    for kategori, haberler in kategori_haberleri.items():
+        for h in haberler:
+            baslik = h.get("title")
+            url = h.get("url")
+            
+            # None olanları normalize et
+            if not baslik or not url:
+                continue
+            
+            url_hash = _url_hash(url)
+            if url_hash in satirlar:
+                if kategori not in satirlar[url_hash][7]:
+                    satirlar[url_hash][7].append(kategori)
+                continue
+            
+            # ISO tarih formatını datetime'a çevir
+            try:
+                tarih_obj = datetime.fromisoformat(h.get("publishedAt").replace("Z", "+00:00"))
+            except:
+                tarih_obj = datetime.now(timezone.utc)
+            
+            satirlar[url_hash] = (
+                baslik,
+                h.get("description"),
+                h.get("urlToImage"),
+                (h.get("source") or {}).get("name"),
+                url,
+                url_hash,
+                kategori,
+                [kategori],
+                tarih_obj
+            )
+    
+    return list(satirlar.values())
+
+def _parmak_izi(satirlar):
+    """Kaydedilecek içeriğin özeti (sıra bağımsız)"""
+    ozet = hashlib.md5()
+    for satir in sorted(satirlar, key=lambda r: r[5]):
+        ozet.update(f"{satir[5]}|{satir[0]}|{satir[1] or ''}|{satir[2] or ''}|{','.join(satir[7])}".encode("utf-8"))
+    return ozet.hexdigest()
+
+def _son_parmak_izi():
+    data = get_cache_bytes(_PARMAK_IZI_KEY)
+    return data.decode("utf-8") if data else None
+
+def _parmak_izi_kaydet(parmak_izi):
+    set_cache_bytes(_PARMAK_IZI_KEY, parmak_izi.encode("utf-8"), Config.NEWS_FINGERPRINT_TTL)
+
+def _eski_haberleri_sil(cursor):
+    """NEWS_RETENTION_DAYS günden eski haberleri sil → silinen sayısı"""
+    silme_tarihi = datetime.utcnow() - timedelta(days=Config.NEWS_RETENTION_DAYS)
+    cursor.execute('DELETE FROM haberler WHERE tarih < %s', (silme_tarihi,))
+    return cursor.rowcount
+
 def haberleri_cek():
-    """NewsAPI'den EN ÇOK HABER OLAN kategoriden haber çeker (3 popüler kategori)."""
+    """NewsAPI'den 3 popüler kategorinin haberlerini çeker, hepsini tek seferde kaydeder."""
     conn = None
     cursor = None
     
     try:
-        # 🔥 Sadece 3 popüler kategoriyi test et (72 istek/gün)
+        # 🔥 Sadece 3 popüler kategori (çalışma başına 3 istek)
         kategoriler = ["sports", "business", "technology"]
         
-        en_cok_kategori = None
-        en_cok_sayi = 0
-        en_cok_haberler = []
+        logger.info("📰 Kategoriler çekiliyor...")
         
-        logger.info("📰 Kategoriler test ediliyor...")
+        # 🔥 3 kategori aynı anda çekilir (süre = en yavaş istek, toplamı değil)
+        sonuclar = run_parallel(
+            {kat: (lambda kat=kat: _kategori_cek(kat)) for kat in kategoriler},
+            deadline=Config.NEWS_FETCH_DEADLINE
+        )
         
+        kategori_haberleri = {}
         for kat in kategoriler:
-            response = requests.get(
-                "https://newsapi.org/v2/top-headlines",
-                params={
-                    "country": "tr",
-                    "category": kat,
-                    "apiKey": Config.NEWS_API_KEY
-                },
-                timeout=10
-            )
+            haberler = sonuclar[kat]
+            if isinstance(haberler, Exception):
+                logger.warning(f"  ⚠ {kat}: {haberler}")
+                continue
             
-            if response.status_code == 200:
-                data = response.json()
-                haberler = data.get("articles", [])
-                haber_sayisi = len(haberler)
-                logger.info(f"  📂 {kat}: {haber_sayisi} haber")
-                
-                if haber_sayisi > en_cok_sayi:
-                    en_cok_sayi = haber_sayisi
-                    en_cok_kategori = kat
-                    en_cok_haberler = haberler
-        
-        if not en_cok_kategori or en_cok_sayi == 0:
+            logger.info(f"  📂 {kat}: {len(haberler)} haber")
+            if haberler:
+                kategori_haberleri[kat] = haberler
+        
+        if not kategori_haberleri:
             logger.warning("⚠ Hiçbir kategoride haber bulunamadı!")
             return 0
         
-        logger.info(f"✅ En çok haber: {en_cok_kategori} ({en_cok_sayi} haber)")
+        # Tüm kategorilerin haberleri tek batch (ücretli isteklerin hiçbiri boşa gitmez)
+        satirlar = _haber_satirlari(kategori_haberleri)
+        
+        # 🔥 Cevap bir önceki çalışmayla aynıysa DB'ye hiç gitme
+        parmak_izi = _parmak_izi(satirlar)
+        if _son_parmak_izi() == parmak_izi:
+            # Saklama süresi yine de uygulanır (NewsAPI uzun süre aynı cevabı dönebilir)
+            with db_cursor(commit=True) as cur:
+                silinen = _eski_haberleri_sil(cur)
+            if silinen:
+                invalidate('haberler')
+            logger.info(f"♻️ Haberler değişmedi, kayıt atlandı. 🗑 {silinen} eski haber silindi.")
+            return 0
         
-        # Şimdi en çok haberi olan kategorinin haberlerini kaydet
         conn = get_db()
         cursor = conn.cursor()
-        eklenen = 0
         
-        for h in en_cok_haberler:
-            baslik = h.get("title")
-            aciklama = h.get("description")
-            gorsel = h.get("urlToImage")
-            url = h.get("url")
-            kaynak = h.get("source", {}).get("name")
-            tarih = h.get("publishedAt")
-            
-            # None olanları normalize et
-            if not baslik or not url:
-                continue
-            
-            # ISO tarih formatını datetime'a çevir
-            try:
-                tarih_obj = datetime.fromisoformat(tarih.replace("Z", "+00:00"))
-            except:
-                tarih_obj = datetime.utcnow()
-            
-            cursor.execute('''
-                INSERT INTO haberler (baslik, aciklama, gorsel, kaynak, url, kategori, tarih)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (baslik) DO NOTHING
-            ''', (
-                baslik,
-                aciklama,
-                gorsel,
-                kaynak,
-                url,
-                en_cok_kategori,  # ✔ En çok haberi olan kategori
-                tarih_obj
-            ))
-            
-            if cursor.rowcount > 0:
-                eklenen += 1
+        # Yakın kopyalar (farklı kaynak, benzer başlık) aynı kume_id'yi alır
+        satirlar = kumeleri_ata(cursor, satirlar)
+        
+        # 🔥 Tek statement, url_hash ile tekilleştirme; var olan habere yeni
+        # kategorisi eklenir (xmax = 0 → gerçekten yeni eklenen satır)
+        eklenen = guncellenen = 0
+        if satirlar:
+            sonuc = execute_values(cursor, '''
+                INSERT INTO haberler (baslik, aciklama, gorsel, kaynak, url, url_hash, kategori, kategoriler, tarih,
+                                      kume_id, minhash)
+                VALUES %s
+                ON CONFLICT (url_hash) DO UPDATE SET
+                    kategoriler = ARRAY(
+                        SELECT DISTINCT unnest(haberler.kategoriler || EXCLUDED.kategoriler) ORDER BY 1
+                    ),
+                    kume_id = COALESCE(haberler.kume_id, EXCLUDED.kume_id),
+                    minhash = COALESCE(haberler.minhash, EXCLUDED.minhash)
+                WHERE NOT haberler.kategoriler @> EXCLUDED.kategoriler
+                   OR (haberler.kume_id IS NULL AND EXCLUDED.kume_id IS NOT NULL)
+                   OR (haberler.minhash IS NULL AND EXCLUDED.minhash IS NOT NULL)
+                RETURNING (xmax = 0) AS yeni
+            ''', satirlar, template="(%s, %s, %s, %s, %s, %s::uuid, %s, %s::text[], %s, %s::uuid, %s)",
+                page_size=len(satirlar), fetch=True)
+            eklenen = sum(1 for (yeni,) in sonuc if yeni)
+            guncellenen = len(sonuc) - eklenen
         
         # 4 günden eski haberleri sil
-        silme_tarihi = datetime.utcnow() - timedelta(days=4)
-        cursor.execute('DELETE FROM haberler WHERE tarih < %s', (silme_tarihi,))
-        silinen = cursor.rowcount
+        silinen = _eski_haberleri_sil(cursor)
         
         conn.commit()
         
-        logger.info(f"✅ {eklenen} yeni haber kaydedildi ({en_cok_kategori}). 🗑 {silinen} eski haber silindi.")
+        _parmak_izi_kaydet(parmak_izi)
+        
+        if eklenen or guncellenen or silinen:
+            invalidate('haberler')
+        
+        logger.info(f"✅ {eklenen} yeni haber kaydedildi ({', '.join(kategori_haberleri)}), "
+                    f"{guncellenen} habere kategori eklendi. 🗑 {silinen} eski haber silindi.")
         return eklenen
         
     except Exception as e:
         logger.error(f"❌ Haber çekme hatası: {e}")
         if conn:
             conn.rollback()
+            sifirla()
         return 0
         
     finally:
@@ -0,0 +1,176 @@
+import math
+import time
+import logging
+import threading
+from datetime import datetime
+from models.db import db_cursor
+from models.market_models import MARKET_TABLES, build_market_snapshot, upsert_market_rows
+from utils.cache import publish_snapshot
+from services import tick_store
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# PİYASA VERİSİ PIPELINE'I
+# ==========================================
+# Her varlık sınıfı (döviz / altın / gümüş) aynı aşamalardan geçer:
+#
+#   fetch → normalize → validate → dedupe → write → publish
+#
+#   fetcher():                   upstream'den ham cevap
+#   normalizer(raw):             [(sembol, *VALUE_COLUMNS[dataset])]
+#   validator(rows):             geçersiz satırları ayıklar
+#   deduper(dataset, rows):      aynı sembol bir kez (sonuncusu kazanır)
+#   writer(dataset, rows):       tek transaction: upsert + history + snapshot
+#                                (commit sonrası worker içi tick deposuna da eklenir)
+#   publisher(dataset, snapshot): commit sonrası write-through cache yayını
+#
+# Servisler yalnızca fetcher / normalizer (gerekirse validator) tanımlar;
+# batching, transaction ve cache yayını tek yerde durur. Her aşamanın süresi
+# ölçülür, son çalışmanın özeti pipeline_stats() ile /metrics'te görünür.
+
+STAGES = ("fetch", "normalize", "validate", "dedupe", "write", "publish")
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+class PipelineError(Exception):
+    """Aşamalardan biri çalışmayı durdurdu (upstream hatası, boş veri vb.)"""
+
+
+# ---------- varsayılan aşamalar ----------
+def price_validator(max_price=None):
+    """
+    Sayısal değerleri pozitif ve sonlu olan satırları geçiren validator
+
+    Args:
+        max_price: Verilirse bu değerin üstündeki fiyatlar anormal sayılır
+    """
+    def validate(rows):
+        valid = []
+        for row in rows:
+            symbol, values = row[0], row[1:]
+            prices = [v for v in values if isinstance(v, float)]
+
+            if any(not math.isfinite(v) or v <= 0 for v in prices):
+                logger.warning(f"⚠️ {symbol} {prices} (negatif/sıfır), atlanıyor")
+                continue
+
+            if max_price is not None and any(v > max_price for v in prices):
+                logger.warning(f"⚠️ {symbol} {prices} (anormal), atlanıyor")
+                continue
+
+            valid.append(row)
+        return valid
+
+    return validate
+
+
+def dedupe_rows(dataset, rows):
+    """
+    Aynı sembol birden çok kez gelirse sonuncusu kazanır. Değişmeyen
+    satırlar da yazılır: history'de run-length satırının valid_until'i bu
+    tick'lerle uzar.
+    """
+    return list({row[0]: row for row in rows}.values())
+
+
+def write_rows(dataset, rows):
+    """Upsert + history + yeni snapshot; hepsi aynı transaction içinde"""
+    with db_cursor(commit=True) as cur:
+        written = upsert_market_rows(cur, dataset, rows)
+        snapshot = build_market_snapshot(cur, dataset)
+        ts = tick_store.tick_time(cur)
+
+    tick_store.record(dataset, rows, ts)
+    return written, snapshot
+
+
+def publish_rows(dataset, snapshot):
+    """Commit sonrası yeni generation olarak atomik yayınla"""
+    publish_snapshot(dataset, snapshot, Config.SNAPSHOT_TIMEOUT)
+    tick_store.published(dataset)
+
+
+# ---------- pipeline ----------
+class MarketPipeline:
+    """Bir varlık sınıfının fetch → ... → publish zinciri"""
+
+    def __init__(self, dataset, label, fetcher, normalizer,
+                 validator=None, deduper=dedupe_rows, writer=write_rows, publisher=publish_rows):
+        if dataset not in MARKET_TABLES:
+            raise ValueError(f"Bilinmeyen tablo: {dataset}")
+
+        self.dataset = dataset
+        self.label = label
+        self.fetcher = fetcher
+        self.normalizer = normalizer
+        self.validator = validator or price_validator()
+        self.deduper = deduper
+        self.writer = writer
+        self.publisher = publisher
+
+    def run(self):
+        """
+        Pipeline'ı bir kez çalıştır
+
+        Returns:
+            True/False (scheduler ve /api/update eski fetch_* ile aynı sonucu bekler)
+        """
+        timings = {}
+        written = 0
+        started = time.perf_counter()
+
+        def timed(stage, fn, *args):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                timings[stage] = round((time.perf_counter() - t0) * 1000, 2)
+
+        try:
+            raw = timed("fetch", self.fetcher)
+            rows = timed("normalize", self.normalizer, raw)
+            rows = timed("validate", self.validator, rows)
+            if not rows:
+                raise PipelineError("geçerli satır yok")
+
+            rows = timed("dedupe", self.deduper, self.dataset, rows)
+            written, snapshot = timed("write", self.writer, self.dataset, rows)
+            timed("publish", self.publisher, self.dataset, snapshot)
+
+            logger.info(f"✅ {written} {self.label} güncellendi ({self._format(timings)})")
+            ok = True
+
+        except Exception as e:
+            logger.error(f"{self.label.capitalize()} çekme hatası: {e}")
+            ok = False
+
+        self._record(ok, written, timings, time.perf_counter() - started)
+        return ok
+
+    @staticmethod
+    def _format(timings):
+        return " ".join(f"{stage}={timings[stage]:.0f}ms" for stage in STAGES if stage in timings)
+
+    def _record(self, ok, written, timings, elapsed):
+        with _stats_lock:
+            stats = _stats.setdefault(self.dataset, {"runs": 0, "failures": 0})
+            stats["runs"] += 1
+            if not ok:
+                stats["failures"] += 1
+            stats.update({
+                "last_run": datetime.utcnow().isoformat() + "Z",
+                "last_ok": ok,
+                "last_rows": written,
+                "last_total_ms": round(elapsed * 1000, 2),
+                "last_stage_ms": timings,
+            })
+
+
+def pipeline_stats():
+    """Bu worker'daki pipeline çalışmalarının özeti"""
+    with _stats_lock:
+        return {dataset: dict(stats) for dataset, stats in _stats.items()}
@@ -0,0 +1,211 @@
+import time
+import logging
+import threading
+from datetime import timezone
+from config import Config
+from models.db import db_cursor, replica_ok
+from models.market_models import MARKET_TABLES, HISTORY_TABLES
+from utils.cache import generation
+from utils.ringbuffer import RunBuffer
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# WORKER İÇİ HAM TICK DEPOSU
+# ==========================================
+# /history isteklerinin çoğu birkaç sembolün son 1-7 gününü ister. Her worker
+# son TICK_STORE_DAYS günün run'larını sembol başına bir RunBuffer'da tutar:
+#   - başlangıçta DB'den ısınır (warm)
+#   - ingestion tick'ini yazan worker run'ı bellekte de uzatır / ekler
+#     (upsert_market_rows ile aynı kural ve aynı transaction zamanı)
+#   - dataset generation'ı değiştiyse (başka worker yazdı) sadece her
+#     sembolün son run'ından itibaren DB'den eşitlenir
+# Pencere içindeki raw sorgular Postgres'e gitmeden ikili aramayla cevaplanır;
+# pencere dışı ya da ring'den taşmış aralıklar DB'ye düşer.
+
+
+class _DatasetStore:
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.name_col = MARKET_TABLES[dataset]
+        self.history_table = HISTORY_TABLES[dataset]
+        self.buffers = {}         # sembol → RunBuffer
+        self.gen = None           # eşitlenen generation (None → ısınmadı)
+        self.covered_from = None  # epoch; bundan sonrası bellekte tam
+        self.pending = False      # yazılmış ama henüz yayınlanmamış tick var
+        self.lock = threading.Lock()
+
+    def _buffer(self, symbol):
+        buf = self.buffers.get(symbol)
+        if buf is None:
+            buf = self.buffers[symbol] = RunBuffer(Config.TICK_STORE_CAPACITY)
+        return buf
+
+    def sync(self, cursor):
+        """
+        DB'deki run'ları uygula
+
+        İlk çağrıda pencere başından, sonrakilerde sembollerin son run
+        başlangıçlarının en eskisinden itibaren okur (sadece son run uzayabilir).
+        Her sembolün pencereden önce başlayıp içine uzanan run'ı index
+        üzerinden ayrıca alınır.
+        """
+        if self.covered_from is None:
+            self.covered_from = time.time() - Config.TICK_STORE_DAYS * 86400
+
+        starts = [buf.last()[0] for buf in self.buffers.values() if len(buf)]
+        since = min(starts) if starts else self.covered_from
+
+        started = time.perf_counter()
+        cursor.execute(f'''
+            SELECT sym, rate,
+                   extract(epoch FROM created_at)::float8,
+                   extract(epoch FROM COALESCE(valid_until, created_at))::float8,
+                   tick_count
+            FROM (
+                SELECT h.{self.name_col} AS sym, h.rate, h.created_at, h.valid_until, h.tick_count
+                FROM {self.dataset} m
+                CROSS JOIN LATERAL (
+                    SELECT {self.name_col}, rate, created_at, valid_until, tick_count
+                    FROM {self.history_table}
+                    WHERE {self.name_col} = m.{self.name_col} AND created_at < to_timestamp(%(since)s)
+                    ORDER BY created_at DESC
+                    LIMIT 1
+                ) h
+                UNION ALL
+                SELECT {self.name_col}, rate, created_at, valid_until, tick_count
+                FROM {self.history_table}
+                WHERE created_at >= to_timestamp(%(since)s)
+            ) runs
+            ORDER BY 3
+        ''', {'since': since})
+
+        rows = cursor.fetchall()
+        for symbol, rate, start, end, count in rows:
+            self._buffer(symbol).upsert(start, end, rate, count)
+
+        logger.debug(f"⏱ {self.history_table}: {len(rows)} run eşitlendi "
+                     f"({(time.perf_counter() - started) * 1000:.0f}ms)")
+
+    def apply_tick(self, rows, ts):
+        """upsert_market_rows'un history kuralını bellekte uygula"""
+        max_gap = Config.HISTORY_MAX_GAP_MINUTES * 60
+        for row in rows:
+            symbol, rate = row[0], float(row[-1])
+            buf = self._buffer(symbol)
+            last = buf.last()
+            if last is not None and last[2] == rate and last[1] >= ts - max_gap:
+                buf.extend_last(ts)
+            else:
+                buf.append(ts, ts, rate)
+
+    def covers(self, buf, since):
+        if self.covered_from is None or since <= self.covered_from:
+            return False
+        return buf is None or buf.evicted_until is None or since > buf.evicted_until
+
+
+_stores = {dataset: _DatasetStore(dataset) for dataset in MARKET_TABLES}
+
+
+def _epoch(dt):
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _format(ts):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(ts))
+
+
+# ---------- yazma tarafı (pipeline) ----------
+def tick_time(cursor):
+    """Transaction zamanı (upsert'in CURRENT_TIMESTAMP'i) epoch olarak"""
+    cursor.execute("SELECT extract(epoch FROM CURRENT_TIMESTAMP)::float8")
+    return cursor.fetchone()[0]
+
+
+def record(dataset, rows, ts):
+    """
+    Commit edilmiş tick'i belleğe ekle
+
+    Depo geride ise (ısınmadı / başka worker yazdı) dokunmaz; sonraki
+    sorgu DB'den eşitler.
+    """
+    store = _stores[dataset]
+    with store.lock:
+        if store.gen is None or store.gen != generation(dataset):
+            return
+        store.apply_tick(rows, ts)
+        store.pending = True
+
+
+def published(dataset):
+    """Yeni snapshot yayınlandı: bellekteki tick'ler bu generation'ı karşılar"""
+    store = _stores[dataset]
+    with store.lock:
+        if store.pending:
+            store.gen = generation(dataset)
+            store.pending = False
+
+
+# ---------- okuma tarafı ----------
+def warm():
+    """Tüm dataset'leri DB'den doldur (worker başlangıcı)"""
+    for dataset, store in _stores.items():
+        try:
+            with store.lock:
+                gen = generation(dataset)
+                with db_cursor(readonly=replica_ok(dataset)) as cursor:
+                    store.sync(cursor)
+                store.gen = gen
+            logger.info(f"⏱ Tick deposu hazır: {dataset} ({len(store.buffers)} sembol)")
+        except Exception as e:
+            logger.error(f"❌ Tick deposu ısınamadı ({dataset}): {e}")
+
+
+def query(dataset, symbol, since):
+    """
+    Ham geçmiş noktaları (history endpoint'inin raw formatında)
+
+    Args:
+        since: datetime (naive ise UTC)
+
+    Returns:
+        [[sembol, kur, "YYYY-MM-DDTHH:MM:SSZ"]]; aralık bellekte yoksa None
+    """
+    store = _stores[dataset]
+    since = _epoch(since)
+
+    try:
+        with store.lock:
+            gen = generation(dataset)
+            if store.gen != gen:
+                with db_cursor(readonly=replica_ok(dataset)) as cursor:
+                    store.sync(cursor)
+                store.gen = gen
+                store.pending = False
+
+            buf = store.buffers.get(symbol)
+            if not store.covers(buf, since):
+                return None
+            points = buf.points(since) if buf is not None else []
+
+    except Exception as e:
+        logger.error(f"❌ Tick deposu okunamadı ({dataset}): {e}")
+        return None
+
+    return [[symbol, rate, _format(ts)] for ts, rate in points]
+
+
+def tick_store_stats():
+    """Bu worker'daki depo durumu"""
+    stats = {}
+    for dataset, store in _stores.items():
+        with store.lock:
+            stats[dataset] = {
+                "generation": store.gen,
+                "symbols": len(store.buffers),
+                "runs": sum(len(buf) for buf in store.buffers.values()),
+            }
+    return stats
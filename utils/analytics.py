@@ -0,0 +1,92 @@
+import numpy as np
+
+# ==========================================
+# FİYAT SERİSİ ANALİTİĞİ (NUMPY)
+# ==========================================
+# Tüm pencereler tek geçişte, pencere sayısı kadar döngü olmadan hesaplanır:
+#   - SMA: kümülatif toplam farkı
+#   - EMA (alpha = 2 / (w + 1), ilk değerle tohumlanır): kapalı formdaki
+#     ağırlık matrisi (pencere x nokta) ile tek matris-vektör çarpımı
+#   - Volatilite: log getirilerin kümülatif toplam / kare toplamından
+#     örneklem standart sapması (kova başına, %)
+#   - Yüksek / düşük: ters serinin kümülatif max / min'i
+#   - Değişim: son değer / w kova önceki değer
+# Serinin uzunluğu pencereyi karşılamıyorsa o pencerenin değerleri None.
+
+
+def _values(arr, valid, digits):
+    return [round(float(v), digits) if ok and np.isfinite(v) else None for v, ok in zip(arr, valid)]
+
+
+def summarize(closes, windows):
+    """
+    Args:
+        closes: Kronolojik kapanış fiyatları (pozitif)
+        windows: Kova cinsinden pencere uzunlukları
+
+    Returns:
+        {"last", "period": {...}, "windows": [{"window", "sma", "ema",
+        "volatility", "high", "low", "change_percent"}]}
+    """
+    x = np.asarray(closes, dtype=np.float64)
+    w = np.asarray(windows, dtype=np.int64)
+    n = len(x)
+
+    full = w <= n
+    wc = np.minimum(w, n)
+    newest_first = x[::-1]
+
+    # SMA
+    cs = np.concatenate(([0.0], np.cumsum(x)))
+    sma = (cs[n] - cs[n - wc]) / wc
+
+    # EMA: k. en yeni noktanın ağırlığı a(1-a)^k, en eski nokta kalan ağırlığı alır
+    alpha = 2.0 / (w + 1.0)
+    decay = (1.0 - alpha)[:, None] ** np.arange(n)[None, :]
+    weights = alpha[:, None] * decay
+    weights[:, -1] = decay[:, -1]
+    ema = weights @ newest_first
+
+    # Yüksek / düşük
+    high = np.maximum.accumulate(newest_first)[wc - 1]
+    low = np.minimum.accumulate(newest_first)[wc - 1]
+
+    # Değişim: w kova önceki değere göre
+    has_base = w < n
+    base = x[np.maximum(n - 1 - w, 0)]
+    change = (x[-1] / base - 1.0) * 100
+
+    # Volatilite: pencerenin son (w - 1) log getirisi
+    returns = np.diff(np.log(x))
+    cr = np.concatenate(([0.0], np.cumsum(returns)))
+    cr2 = np.concatenate(([0.0], np.cumsum(returns ** 2)))
+    m = wc - 1
+    has_returns = full & (m >= 2)
+    m_safe = np.maximum(m, 2)
+    total = cr[n - 1] - cr[np.maximum(n - 1 - m, 0)]
+    total2 = cr2[n - 1] - cr2[np.maximum(n - 1 - m, 0)]
+    var = (total2 - total ** 2 / m_safe) / (m_safe - 1)
+    volatility = np.sqrt(np.maximum(var, 0.0)) * 100
+
+    rows = zip(
+        w.tolist(),
+        _values(sma, full, 6),
+        _values(ema, full, 6),
+        _values(volatility, has_returns, 4),
+        _values(high, full, 6),
+        _values(low, full, 6),
+        _values(change, has_base, 4),
+    )
+
+    return {
+        "last": round(float(x[-1]), 6),
+        "period": {
+            "high": round(float(x.max()), 6),
+            "low": round(float(x.min()), 6),
+            "change_percent": round(float((x[-1] / x[0] - 1.0) * 100), 4),
+        },
+        "windows": [
+            dict(zip(("window", "sma", "ema", "volatility", "high", "low", "change_percent"), row))
+            for row in rows
+        ],
+    }
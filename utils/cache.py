@@ -1,97 +1,560 @@
-import redis
+import threading
+import time
+import os
 import logging
+from collections import OrderedDict
+import ujson
 from config import Config
+from utils.cache_backends import RedisBackend, SharedMemoryBackend
 
 logger = logging.getLogger(__name__)
 
-# Redis client
-redis_client = None
+# Tüm NouvsApp key'leri bu prefix ile başlar: "nouvsapp:currencies:all"
+KEY_PREFIX = "nouvsapp"
 
-def init_redis():
-    """Redis bağlantısını başlat"""
-    global redis_client
-    
-    if not Config.REDIS_URL:
-        logger.warning("⚠️ REDIS_URL bulunamadı, cache devre dışı")
-        return False
-    
-    try:
-        redis_client = redis.from_url(Config.REDIS_URL, decode_responses=True)
-        redis_client.ping()
-        logger.info("✅ Redis bağlantısı başarılı")
-        return True
-    except Exception as e:
-        logger.error(f"❌ Redis bağlantı hatası: {e}")
-        redis_client = None
-        return False
+# Paylaşılan 2. katman (RedisBackend / SharedMemoryBackend), yoksa None
+backend = None
+
+# ==========================================
+# LOCAL LRU (WORKER İÇİ 1. KATMAN)
+# ==========================================
+class LocalLRU:
+    """Worker içi, TTL destekli, boyutu sınırlı LRU cache (thread-safe)"""
+
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self._data = OrderedDict()  # key -> (fresh_until, expires_at, value)
+        self._lock = threading.Lock()
+
+    def _lookup(self, key, allow_stale):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            fresh_until, expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                return None
+            if fresh_until <= now and not allow_stale:
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def get(self, key):
+        """Sadece taze değer"""
+        return self._lookup(key, allow_stale=False)
+
+    def get_stale(self, key):
+        """Süresi dolmuş ama stale penceresindeki değer de kabul"""
+        return self._lookup(key, allow_stale=True)
+
+    def set(self, key, value, ttl, stale_ttl=0):
+        fresh_until = time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (fresh_until, fresh_until + stale_ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+local_cache = LocalLRU(Config.CACHE_LOCAL_MAX_ITEMS)
+
+# ==========================================
+# HIT / MISS SAYAÇLARI
+# ==========================================
+_stats_lock = threading.Lock()
+_stats = {
+    "local_hits": 0,
+    "shared_hits": 0,
+    "misses": 0,
+    "sets": 0,
+    "errors": 0,
+    "loads": 0,          # loader (DB) çağrıları
+    "coalesced": 0,      # başka thread'in yüklemesini bekleyen istekler
+    "stale_served": 0,   # stale-while-revalidate ile dönen cevaplar
+    "lock_waits": 0,     # başka process'in kilidini bekleyen istekler
+}
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+def cache_stats():
+    """Worker'ın cache sayaçlarını döndür"""
+    with _stats_lock:
+        stats = dict(_stats)
+
+    lookups = stats["local_hits"] + stats["shared_hits"] + stats["misses"]
+    hits = stats["local_hits"] + stats["shared_hits"]
+    stats["hit_ratio"] = round(hits / lookups, 4) if lookups else 0.0
+    stats["local_items"] = len(local_cache)
+    stats["backend"] = backend.name if backend else "local"
+    return stats
+
+# ==========================================
+# KEY & SERİLEŞTİRME
+# ==========================================
+def make_key(*parts):
+    """Namespace'li cache key üret: make_key("currencies", "USD") → "nouvsapp:currencies:USD" """
+    return ":".join([KEY_PREFIX] + [str(p) for p in parts])
+
+def encode(value):
+    """Python değerini bir kez JSON byte'larına çevir"""
+    return ujson.dumps(value, ensure_ascii=False).encode("utf-8")
+
+def decode(data):
+    """JSON byte'larını Python değerine çevir"""
+    return ujson.loads(data)
+
+# ==========================================
+# PAYLAŞILAN 2. KATMAN (BACKEND SEÇİMİ)
+# ==========================================
+def init_backend():
+    """
+    Config.CACHE_BACKEND'e göre paylaşılan cache'i başlat
+
+    "auto": REDIS_URL varsa Redis, yoksa aynı host'taki worker'ların
+    paylaştığı /dev/shm cache'i. "redis", "shm" veya "local" (sadece worker içi)
+    ile zorlanabilir.
+    """
+    global backend
+
+    choice = Config.CACHE_BACKEND
+    if choice == "auto":
+        choice = "redis" if Config.REDIS_URL else "shm"
+
+    backend = None
+
+    if choice == "redis":
+        if not Config.REDIS_URL:
+            logger.warning("⚠️ REDIS_URL bulunamadı, shared memory cache kullanılacak")
+            choice = "shm"
+        else:
+            try:
+                backend = RedisBackend(Config.REDIS_URL)
+                logger.info("✅ Redis bağlantısı başarılı")
+                return True
+            except Exception as e:
+                logger.error(f"❌ Redis bağlantı hatası: {e}")
+                choice = "shm"
+
+    if choice == "shm":
+        try:
+            backend = SharedMemoryBackend(Config.CACHE_SHM_DIR)
+            logger.info(f"✅ Shared memory cache aktif ({backend.directory})")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Shared memory cache hatası: {e}")
+
+    logger.warning("⚠️ Paylaşılan cache yok, sadece worker içi cache kullanılacak")
+    return False
+
+def _local_ttl(ttl):
+    return min(ttl, Config.CACHE_LOCAL_TTL)
+
+# ==========================================
+# PUBLIC METHODS
+# ==========================================
+def get_cache_bytes(key):
+    """
+    Cache'den ham JSON byte'larını al (önce local LRU, sonra paylaşılan backend)
+
+    Args:
+        key: Cache anahtarı (dataset_key / make_key ile üret)
+
+    Returns:
+        bytes or None
+    """
+    data = local_cache.get(key)
+    if data is not None:
+        _count("local_hits")
+        return data
+
+    if backend:
+        try:
+            data = backend.get(key)
+        except Exception as e:
+            logger.error(f"❌ Cache get hatası ({key}): {e}")
+            _count("errors")
+            data = None
+
+        if data is not None:
+            _count("shared_hits")
+            logger.debug(f"🎯 Cache hit: {key}")
+            local_cache.set(key, data, Config.CACHE_LOCAL_TTL)
+            return data
+
+    _count("misses")
+    return None
 
 def get_cache(key):
     """
     Cache'den veri al
-    
+
     Args:
-        key: Cache anahtarı (prefix ile kullan: "nouvsapp:currencies")
-    
+        key: Cache anahtarı (dataset_key / make_key ile üret)
+
     Returns:
         Cached data or None
     """
-    if not redis_client:
-        return None
-    
-    try:
-        data = redis_client.get(key)
-        if data:
-            logger.debug(f"🎯 Cache hit: {key}")
-        return data
-    except Exception as e:
-        logger.error(f"❌ Cache get hatası ({key}): {e}")
+    data = get_cache_bytes(key)
+    if data is None:
         return None
+    return decode(data)
 
-def set_cache(key, data, ttl=None):
+def set_cache_bytes(key, data, ttl=None):
     """
-    Cache'e veri kaydet
-    
+    Hazır JSON byte'larını iki katmana da yaz
+
     Args:
-        key: Cache anahtarı (prefix ile kullan: "nouvsapp:currencies")
-        data: Kaydedilecek veri (string olmalı, JSON.stringify edilmiş)
+        key: Cache anahtarı (dataset_key / make_key ile üret)
+        data: encode() ile üretilmiş byte'lar
         ttl: Time-to-live (saniye), None ise Config.CACHE_TIMEOUT kullanılır
     """
-    if not redis_client:
-        return False
-    
+    if ttl is None:
+        ttl = Config.CACHE_TIMEOUT
+
+    local_cache.set(key, data, _local_ttl(ttl))
+    _count("sets")
+
+    if not backend:
+        return True
+
     try:
-        if ttl is None:
-            ttl = Config.CACHE_TIMEOUT
-        
-        redis_client.setex(key, ttl, data)
+        backend.set(key, data, ttl * 1000)
         logger.debug(f"💾 Cache set: {key} (TTL: {ttl}s)")
         return True
     except Exception as e:
         logger.error(f"❌ Cache set hatası ({key}): {e}")
+        _count("errors")
         return False
 
-def clear_cache(pattern="nouvsapp:*"):
+def set_cache(key, data, ttl=None):
     """
-    Cache'i temizle (sadece NouvsApp keylerini)
-    
+    Cache'e veri kaydet (JSON'a bir kez çevrilir)
+
     Args:
-        pattern: Silinecek key pattern'i (default: nouvsapp:*)
+        key: Cache anahtarı (dataset_key / make_key ile üret)
+        data: JSON'a çevrilebilir veri
+        ttl: Time-to-live (saniye), None ise Config.CACHE_TIMEOUT kullanılır
     """
-    if not redis_client:
-        logger.warning("⚠️ Redis bağlantısı yok, cache temizlenemedi")
-        return False
-    
+    return set_cache_bytes(key, encode(data), ttl)
+
+# ==========================================
+# GENERATION (VERSİYONLU KEY) SİSTEMİ
+# ==========================================
+# Her dataset'in bir generation numarası var. Key'ler bu numarayı içerir:
+#   nouvsapp:currencies:g42:all
+# Invalidation = sayıyı 1 artırmak (O(1)). Eski generation'ın key'lerine
+# artık kimse bakmaz, TTL ile kendiliğinden düşerler. KEYS/SCAN yok.
+DATASETS = ("currencies", "golds", "silvers", "haberler")
+
+_generations = {}  # dataset -> (checked_at, generation)
+_generation_changed = {}  # dataset -> bu worker'ın generation değişimini gördüğü an
+_generations_lock = threading.Lock()
+
+def _generation_key(dataset):
+    return make_key("gen", dataset)
+
+def _remember_generation(dataset, gen):
+    now = time.monotonic()
+    with _generations_lock:
+        entry = _generations.get(dataset)
+        if entry is None or entry[1] != gen:
+            _generation_changed[dataset] = now
+        _generations[dataset] = (now, gen)
+
+def generation(dataset):
+    """
+    Dataset'in güncel generation numarası
+
+    Backend'e her istekte gitmemek için worker içinde
+    Config.CACHE_GENERATION_TTL saniye hatırlanır.
+    """
+    with _generations_lock:
+        entry = _generations.get(dataset)
+
+    if entry and (not backend or time.monotonic() - entry[0] < Config.CACHE_GENERATION_TTL):
+        return entry[1]
+
+    gen = entry[1] if entry else 0
+    if backend:
+        try:
+            gen = backend.get_int(_generation_key(dataset))
+        except Exception as e:
+            logger.error(f"❌ Generation okuma hatası ({dataset}): {e}")
+            _count("errors")
+
+    _remember_generation(dataset, gen)
+    return gen
+
+def generation_age(dataset):
+    """
+    Bu worker'ın dataset'in güncel generation'ını ilk gördüğünden beri geçen
+    saniye (worker başlangıcında görülen generation da yeni sayılır)
+    """
+    generation(dataset)
+    with _generations_lock:
+        return time.monotonic() - _generation_changed[dataset]
+
+def dataset_key(dataset, *parts):
+    """Güncel generation'a bağlı key: dataset_key("currencies", "USD") → "nouvsapp:currencies:g42:USD" """
+    return make_key(dataset, f"g{generation(dataset)}", *parts)
+
+def invalidate(*datasets):
+    """
+    Verilen dataset'lerin cache'ini geçersiz kıl (generation += 1)
+
+    Args:
+        datasets: "currencies", "golds", "silvers", "haberler"
+    """
+    if not backend:
+        for dataset in datasets:
+            _remember_generation(dataset, generation(dataset) + 1)
+        return True
+
     try:
-        keys = redis_client.keys(pattern)
-        if keys:
-            redis_client.delete(*keys)
-            logger.info(f"🗑️ {len(keys)} cache key temizlendi ({pattern})")
-        else:
-            logger.info(f"✅ Temizlenecek cache key yok ({pattern})")
+        for dataset in datasets:
+            _remember_generation(dataset, backend.incr(_generation_key(dataset)))
+        logger.info(f"🔄 Cache generation artırıldı: {', '.join(datasets)}")
         return True
     except Exception as e:
-        logger.error(f"❌ Cache temizleme hatası: {e}")
+        logger.error(f"❌ Cache invalidation hatası: {e}")
+        _count("errors")
         return False
 
-# Redis'i başlat (import edildiğinde)
-init_redis()
+def publish_snapshot(dataset, entries, ttl=None):
+    """
+    Yeni generation'ı ve içeriğini atomik olarak yayınla
+
+    Key'ler yeni generation altında yazılır ve generation sayacı aynı
+    atomik adımda ilerletilir (Redis: WATCH/MULTI/EXEC, shm: flock);
+    okuyucular ya eski ya yeni snapshot'ı görür, hiçbir zaman boş bir
+    cache görmez.
+
+    Args:
+        dataset: "currencies", "golds", "silvers", "haberler"
+        entries: {key_suffix: bytes} (örn. {"all": ..., "USD": ...})
+        ttl: Time-to-live (saniye), None ise Config.CACHE_TIMEOUT kullanılır
+    """
+    if ttl is None:
+        ttl = Config.CACHE_TIMEOUT
+
+    def build(new_gen):
+        return {make_key(dataset, f"g{new_gen}", suffix): data for suffix, data in entries.items()}
+
+    if backend:
+        try:
+            new_gen = backend.publish(_generation_key(dataset), build, ttl * 1000)
+        except Exception as e:
+            logger.error(f"❌ Snapshot yayınlama hatası ({dataset}): {e}")
+            _count("errors")
+            return False
+    else:
+        new_gen = generation(dataset) + 1
+
+    for key, data in build(new_gen).items():
+        local_cache.set(key, data, _local_ttl(ttl))
+    _remember_generation(dataset, new_gen)
+    _count("sets")
+
+    logger.debug(f"💾 Snapshot yayınlandı: {dataset} g{new_gen} ({len(entries)} key)")
+    return True
+
+# ==========================================
+# SINGLE-FLIGHT (STAMPEDE KORUMASI)
+# ==========================================
+# Bir key'in süresi dolduğunda aynı SQL'i yalnızca bir çağıran çalıştırır:
+#   - Process içinde: key başına tek loader, diğer thread'ler sonucu bekler
+#   - Process'ler arası: backend üzerinde kısa ömürlü kilit (Redis: SET NX PX)
+# Elinde stale değer olanlar beklemez, stale değeri döner (SWR).
+class _Flight:
+    """Process içinde devam eden tek bir yükleme"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+# Loader None döndüğünde (404: bilinmeyen kod / haber) key'e yazılan işaret;
+# JSON gövdeleri NUL ile başlamaz. Olmayan kaydın sorgusu CACHE_NEGATIVE_TTL
+# boyunca tekrar çalışmaz, kilidi bekleyen process'ler de sonucu görür.
+_MISSING = b"\x00missing"
+
+def _unwrap(data):
+    return None if data == _MISSING else data
+
+def _read_with_staleness(key, stale_ttl):
+    """Backend'ten değeri ve taze olup olmadığını oku → (data, fresh_ms)"""
+    if not backend:
+        return None, 0
+
+    try:
+        data, pttl = backend.get_with_ttl(key)
+    except Exception as e:
+        logger.error(f"❌ Cache get hatası ({key}): {e}")
+        _count("errors")
+        return None, 0
+
+    if data is None:
+        return None, 0
+
+    # Son stale_ttl saniye "stale" pencere sayılır
+    fresh_ms = pttl - stale_ttl * 1000 if pttl > 0 else Config.CACHE_LOCAL_TTL * 1000
+    return data, fresh_ms
+
+def _acquire_lock(lock_key, token):
+    if not backend:
+        return True
+    try:
+        return backend.acquire_lock(lock_key, token, Config.CACHE_LOCK_TIMEOUT_MS)
+    except Exception as e:
+        logger.error(f"❌ Cache kilit hatası ({lock_key}): {e}")
+        _count("errors")
+        return True  # Backend sorunluysa kendimiz yükleriz
+
+def _release_lock(lock_key, token):
+    if not backend:
+        return
+    try:
+        backend.release_lock(lock_key, token)
+    except Exception as e:
+        logger.error(f"❌ Cache kilit bırakma hatası ({lock_key}): {e}")
+
+def _wait_for_other_process(key):
+    """Kilidi tutan process'in değeri yazmasını kısa süre bekle"""
+    deadline = time.monotonic() + Config.CACHE_LOCK_TIMEOUT_MS / 1000
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        try:
+            data = backend.get(key)
+        except Exception:
+            return None
+        if data is not None:
+            return data
+    return None
+
+def _load(key, loader, ttl, stale_ttl, stale):
+    """Lider çağıran: (gerekirse) paylaşılan kilidi al, loader'ı çalıştır, yaz"""
+    lock_key = f"{key}:lock"
+    token = f"{os.getpid()}:{threading.get_ident()}:{time.monotonic()}"
+
+    if not _acquire_lock(lock_key, token):
+        _count("lock_waits")
+        if stale is not None:
+            _count("stale_served")
+            return _unwrap(stale)
+        data = _wait_for_other_process(key)
+        if data is not None:
+            local_cache.set(key, data, _local_ttl(ttl), stale_ttl)
+            return _unwrap(data)
+        # Diğer process zamanında bitiremedi → kendimiz yükleriz
+
+    try:
+        _count("loads")
+        data = loader()
+        stored, store_ttl = (data, ttl) if data is not None else (_MISSING, Config.CACHE_NEGATIVE_TTL)
+        local_cache.set(key, stored, _local_ttl(store_ttl), stale_ttl)
+        _count("sets")
+        if backend:
+            try:
+                backend.set(key, stored, (store_ttl + stale_ttl) * 1000)
+            except Exception as e:
+                logger.error(f"❌ Cache set hatası ({key}): {e}")
+                _count("errors")
+        return data
+    finally:
+        _release_lock(lock_key, token)
+
+def get_or_load(key, loader, ttl=None, stale_ttl=None):
+    """
+    Cache'den oku, yoksa loader'ı key başına TEK kez çalıştır
+
+    Args:
+        key: Cache anahtarı (dataset_key ile üret)
+        loader: Parametresiz fonksiyon → bytes (encode ile) veya None
+            (bulunamadı; CACHE_NEGATIVE_TTL boyunca cache'lenir)
+        ttl: Taze kalma süresi (saniye), None ise Config.CACHE_TIMEOUT
+        stale_ttl: TTL sonrası stale olarak sunulabilecek süre, None ise Config.CACHE_STALE_TTL
+
+    Returns:
+        bytes or None
+    """
+    if ttl is None:
+        ttl = Config.CACHE_TIMEOUT
+    if stale_ttl is None:
+        stale_ttl = Config.CACHE_STALE_TTL
+
+    # 1. Local LRU (taze)
+    data = local_cache.get(key)
+    if data is not None:
+        _count("local_hits")
+        return _unwrap(data)
+
+    # 2. Paylaşılan backend (taze veya stale)
+    data, fresh_ms = _read_with_staleness(key, stale_ttl)
+    if data is not None and fresh_ms > 0:
+        _count("shared_hits")
+        local_cache.set(key, data, min(_local_ttl(ttl), fresh_ms / 1000), stale_ttl)
+        return _unwrap(data)
+
+    stale = data if data is not None else local_cache.get_stale(key)
+    _count("misses")
+
+    # 3. Process içi single-flight
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        if stale is not None:
+            _count("stale_served")
+            return _unwrap(stale)
+        _count("coalesced")
+        if flight.done.wait(Config.CACHE_LOCK_TIMEOUT_MS / 1000):
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        # Lider takıldı → beklemeden kendimiz yükleriz
+        return loader()
+
+    try:
+        flight.result = _load(key, loader, ttl, stale_ttl, stale)
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+def clear_cache(*datasets):
+    """
+    Cache'i temizle → dataset'lerin generation'ını artırır (KEYS taraması yok)
+
+    Args:
+        datasets: Boş ise tüm dataset'ler
+    """
+    return invalidate(*(datasets or DATASETS))
+
+# Paylaşılan cache'i başlat (import edildiğinde)
+init_backend()
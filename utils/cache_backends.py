@@ -0,0 +1,364 @@
+import os
+import time
+import fcntl
+import hashlib
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# BACKEND ARAYÜZÜ
+# ==========================================
+class CacheBackend:
+    """
+    utils/cache'in 2. katmanı (worker'lar arası paylaşılan cache)
+
+    Tüm süreler milisaniye. Hatalar exception olarak yükselir,
+    utils/cache yakalar ve sayaçlara yazar.
+    """
+
+    name = "none"
+
+    def get(self, key):
+        """→ bytes or None"""
+        raise NotImplementedError
+
+    def get_with_ttl(self, key):
+        """→ (bytes or None, kalan süre ms; süresiz ise -1)"""
+        raise NotImplementedError
+
+    def set(self, key, data, ttl_ms):
+        raise NotImplementedError
+
+    def get_int(self, key):
+        """Sayaç oku (yoksa 0)"""
+        raise NotImplementedError
+
+    def incr(self, key, ttl_ms=0):
+        """Sayacı atomik olarak 1 artır → yeni değer (ttl_ms verilirse süreli)"""
+        raise NotImplementedError
+
+    def publish(self, counter_key, build, ttl_ms):
+        """
+        Sayacı bir ileri taşı ve yeni değere ait key'leri yaz (atomik)
+
+        Args:
+            counter_key: Generation sayacının key'i
+            build: yeni_değer → {key: bytes}
+        Returns:
+            Yeni sayaç değeri
+        """
+        raise NotImplementedError
+
+    def acquire_lock(self, key, token, ttl_ms):
+        """Kısa ömürlü kilit (SET NX PX) → True/False"""
+        raise NotImplementedError
+
+    def release_lock(self, key, token):
+        """Kilit hâlâ bizdeyse bırak"""
+        raise NotImplementedError
+
+
+# ==========================================
+# REDIS BACKEND
+# ==========================================
+_UNLOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+class RedisBackend(CacheBackend):
+    """Redis (REDIS_URL) üzerinde paylaşılan cache"""
+
+    name = "redis"
+
+    def __init__(self, url):
+        import redis
+
+        # decode_responses=False → değerler JSON byte'ları olarak saklanır
+        self.client = redis.from_url(url, decode_responses=False)
+        self.client.ping()
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def get_with_ttl(self, key):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.pttl(key)
+        data, pttl = pipe.execute()
+        return data, pttl
+
+    def set(self, key, data, ttl_ms):
+        self.client.set(key, data, px=ttl_ms)
+
+    def get_int(self, key):
+        return int(self.client.get(key) or 0)
+
+    def incr(self, key, ttl_ms=0):
+        if not ttl_ms:
+            return int(self.client.incr(key))
+        pipe = self.client.pipeline(transaction=True)
+        pipe.incr(key)
+        pipe.pexpire(key, ttl_ms)
+        return int(pipe.execute()[0])
+
+    def publish(self, counter_key, build, ttl_ms):
+        def _publish(pipe):
+            new_value = int(pipe.get(counter_key) or 0) + 1
+            pipe.multi()
+            for key, data in build(new_value).items():
+                pipe.set(key, data, px=ttl_ms)
+            pipe.set(counter_key, new_value)
+            return new_value
+
+        return self.client.transaction(_publish, counter_key, value_from_callable=True)
+
+    def acquire_lock(self, key, token, ttl_ms):
+        return bool(self.client.set(key, token, nx=True, px=ttl_ms))
+
+    def release_lock(self, key, token):
+        self.client.eval(_UNLOCK_SCRIPT, 1, key, token)
+
+
+# ==========================================
+# SHARED MEMORY BACKEND (/dev/shm)
+# ==========================================
+class SharedMemoryBackend(CacheBackend):
+    """
+    Aynı host'taki tüm gunicorn worker'larının paylaştığı cache
+
+    Redis olmayan küçük instance'lar için. Her key, tmpfs (/dev/shm) üzerinde
+    bir dosya: [8 byte son kullanma zamanı (ms)] + [JSON byte'ları].
+    tmpfs RAM'de durur, dosyalar os.replace ile atomik yazılır; okuyucu her
+    zaman ya eski ya yeni değerin tamamını görür. Sayaçlar ve kilitler
+    flock / os.link ile process'ler arası güvenlidir.
+    """
+
+    name = "shm"
+
+    _HEADER = 8
+    _NO_EXPIRY = 0
+
+    def __init__(self, directory=None, sweep_every=200):
+        if not directory:
+            base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            directory = os.path.join(base, "nouvsapp-cache")
+
+        self.directory = directory
+        self.sweep_every = sweep_every
+        self._writes = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock_path = os.path.join(self.directory, ".lock")
+
+    # ---------- yardımcılar ----------
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    @staticmethod
+    def _now_ms():
+        return int(time.time() * 1000)
+
+    def _read(self, key):
+        """→ (expires_at_ms, data) or (None, None)"""
+        try:
+            with open(self._path(key), "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None, None
+
+        if len(raw) < self._HEADER:
+            return None, None
+
+        expires_at = int.from_bytes(raw[:self._HEADER], "big")
+        if expires_at != self._NO_EXPIRY and expires_at <= self._now_ms():
+            return None, None
+        return expires_at, raw[self._HEADER:]
+
+    def _tmp_file(self, content):
+        """İçeriği yazılmış geçici dosya → yol (os.replace / os.link için)"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+        except Exception:
+            self._unlink(tmp_path)
+            raise
+        return tmp_path
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def _write(self, key, data, ttl_ms, held=False):
+        """
+        Atomik yaz. os.replace _locked() altında yapılır ki _sweep'in
+        "süresi doldu mu" kontrolü ile silmesi arasına yeni değer girmesin;
+        incr / publish kilidi zaten tuttuğu için held=True verir.
+        """
+        expires_at = self._now_ms() + ttl_ms if ttl_ms else self._NO_EXPIRY
+        tmp_path = self._tmp_file(expires_at.to_bytes(self._HEADER, "big") + data)
+        try:
+            if held:
+                os.replace(tmp_path, self._path(key))
+            else:
+                with self._locked():
+                    os.replace(tmp_path, self._path(key))
+        except Exception:
+            self._unlink(tmp_path)
+            raise
+
+    def _expires_at(self, path):
+        with open(path, "rb") as f:
+            return int.from_bytes(f.read(self._HEADER), "big")
+
+    def _expired(self, expires_at, now):
+        return expires_at != self._NO_EXPIRY and expires_at <= now
+
+    def _sweep(self):
+        """Süresi dolmuş dosyaları sil (TTL ile yaşlanan eski generation'lar)"""
+        now = self._now_ms()
+        candidates = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(".") or entry.name.endswith(".lock"):
+                continue
+            try:
+                if self._expired(self._expires_at(entry.path), now):
+                    candidates.append(entry.path)
+            except OSError:
+                continue
+
+        if not candidates:
+            return
+
+        # Kilitsiz taramadan sonra başka worker aynı key'i yeniden yazmış
+        # olabilir → silmeden önce kilit altında tekrar kontrol
+        removed = 0
+        with self._locked():
+            now = self._now_ms()
+            for path in candidates:
+                try:
+                    if self._expired(self._expires_at(path), now):
+                        os.unlink(path)
+                        removed += 1
+                except OSError:
+                    continue
+        if removed:
+            logger.debug(f"🧹 Shared cache: {removed} süresi dolmuş key silindi")
+
+    def _locked(self):
+        """Process'ler arası kısa kritik bölge (flock)"""
+        return _FileLock(self._lock_path)
+
+    # ---------- arayüz ----------
+    def get(self, key):
+        return self._read(key)[1]
+
+    def get_with_ttl(self, key):
+        expires_at, data = self._read(key)
+        if data is None:
+            return None, -2
+        if expires_at == self._NO_EXPIRY:
+            return data, -1
+        return data, expires_at - self._now_ms()
+
+    def set(self, key, data, ttl_ms):
+        self._write(key, data, ttl_ms)
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            self._sweep()
+
+    def get_int(self, key):
+        data = self.get(key)
+        return int(data) if data else 0
+
+    def incr(self, key, ttl_ms=0):
+        with self._locked():
+            value = self.get_int(key) + 1
+            self._write(key, str(value).encode(), ttl_ms, held=True)
+            return value
+
+    def publish(self, counter_key, build, ttl_ms):
+        with self._locked():
+            new_value = self.get_int(counter_key) + 1
+            # Önce yeni generation'ın key'leri, en son sayaç → okuyucu
+            # yeni generation'ı gördüğünde key'leri hazırdır
+            for key, data in build(new_value).items():
+                self._write(key, data, ttl_ms, held=True)
+            self._write(counter_key, str(new_value).encode(), 0, held=True)
+            return new_value
+
+    def _lock_holder(self, path, ttl_ms):
+        """
+        Kilit dosyası → (bitiş ms, token). Dosya os.link ile içeriği yazılmış
+        olarak oluştuğundan boş / bozuk içerik beklenmez; yine de görülürse
+        kilit tutuluyor sayılır ve süresi dosyanın mtime'ından hesaplanır.
+        """
+        with open(path, "rb") as f:
+            raw = f.read()
+        expires_at, _, token = raw.partition(b" ")
+        try:
+            return int(expires_at), token
+        except ValueError:
+            return int(os.stat(path).st_mtime * 1000) + ttl_ms, token
+
+    def acquire_lock(self, key, token, ttl_ms):
+        path = self._path(key) + ".lock"
+        tmp_path = self._tmp_file(f"{self._now_ms() + ttl_ms} {token}".encode())
+        try:
+            for _ in range(2):
+                try:
+                    # link hedef varsa EEXIST ile düşer: oluşturma + içerik atomik
+                    os.link(tmp_path, path)
+                    return True
+                except FileExistsError:
+                    pass
+
+                # Süresi dolmuş kilit → kilit altında tekrar kontrol edip sil,
+                # bir kez daha dene
+                with self._locked():
+                    try:
+                        expires_at, _ = self._lock_holder(path, ttl_ms)
+                    except FileNotFoundError:
+                        continue
+                    if expires_at > self._now_ms():
+                        return False
+                    self._unlink(path)
+            return False
+        finally:
+            self._unlink(tmp_path)
+
+    def release_lock(self, key, token):
+        path = self._path(key) + ".lock"
+        with self._locked():
+            try:
+                _, held = self._lock_holder(path, 0)
+                if held == token.encode():
+                    os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+class _FileLock:
+    """fcntl.flock tabanlı context manager"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+        return False
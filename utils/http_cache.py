@@ -0,0 +1,103 @@
+import gzip
+import hashlib
+import logging
+from flask import Response, request
+from config import Config
+from utils.cache import LocalLRU
+
+try:
+    import brotli
+except ImportError:  # brotli opsiyonel, yoksa sadece gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# HAZIR CEVAP VARYANTLARI (ETag + gzip/br)
+# ==========================================
+# Cache key'leri generation içerdiği için (nouvsapp:currencies:g42:all)
+# ETag ve sıkıştırılmış gövdeler generation başına bir kez hesaplanır.
+# Strong ETag her content-coding için ayrıdır: "<hash>", "<hash>-gz", "<hash>-br".
+_variants = LocalLRU(Config.CACHE_LOCAL_MAX_ITEMS)
+
+_ETAG_SUFFIXES = {None: "", "gzip": "-gz", "br": "-br"}
+
+
+class _Variant:
+    """Bir cache key'inin ham gövdesi, ETag'i ve sıkıştırılmış halleri"""
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.encoded = {}
+
+    def encode(self, encoding):
+        data = self.encoded.get(encoding)
+        if data is None:
+            if encoding == "br":
+                data = brotli.compress(self.body, quality=Config.BROTLI_QUALITY)
+            else:
+                data = gzip.compress(self.body, compresslevel=Config.GZIP_LEVEL)
+            self.encoded[encoding] = data
+        return data
+
+
+def _variant(cache_key, body):
+    variant = _variants.get(cache_key)
+    if variant is None or (variant.body is not body and variant.body != body):
+        variant = _Variant(body)
+        _variants.set(cache_key, variant, Config.CACHE_TIMEOUT)
+    return variant
+
+
+def _pick_encoding(size):
+    if size < Config.COMPRESS_MIN_BYTES:
+        return None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def cached_response(cache_key, body, max_age, stale_while_revalidate=0):
+    """
+    Hazır JSON gövdesinden HTTP cevabı üret
+
+    - Accept-Encoding'e göre br/gzip varyantı (bir kez sıkıştırılır)
+    - Varyant başına strong ETag; If-None-Match (weak karşılaştırma,
+      W/"..." de eşleşir) tutarsa 304 (gövde yok)
+    - Güncelleme periyoduna uygun Cache-Control
+
+    Args:
+        cache_key: Gövdenin cache key'i (generation içerir)
+        body: encode() ile üretilmiş JSON byte'ları
+        max_age: Cache-Control max-age (saniye)
+        stale_while_revalidate: Cache-Control stale-while-revalidate (saniye)
+    """
+    variant = _variant(cache_key, body)
+
+    cache_control = f"public, max-age={max_age}"
+    if stale_while_revalidate:
+        cache_control += f", stale-while-revalidate={stale_while_revalidate}"
+
+    encoding = _pick_encoding(len(body))
+    etag = variant.etag + _ETAG_SUFFIXES[encoding]
+
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+
+    if request.if_none_match.contains_weak(etag):
+        return Response(status=304, headers=headers)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        data = variant.encode(encoding)
+    else:
+        data = body
+
+    return Response(data, status=200, mimetype="application/json", headers=headers)
@@ -0,0 +1,201 @@
+import os
+import time
+import random
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from config import Config
+from utils.quota import check_quota, record_call
+from utils.parallel import current_deadline
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# PAYLAŞILAN UPSTREAM HTTP CLIENT
+# ==========================================
+# services/* içindeki tüm dış API çağrıları buradan geçer:
+#   - Keep-alive: worker başına tek Session, host başına havuzlanmış bağlantılar
+#     (her 10 dakikalık çalışmada yeniden TCP + TLS el sıkışması yok)
+#   - Sınırlı sayıda, jitter'lı exponential backoff ile tekrar deneme
+#   - Sağlayıcı bazlı timeout (Config.UPSTREAM_TIMEOUTS); çağıranın deadline'ı
+#     varsa (run_parallel) her denemenin timeout'u ve backoff'u kalan süreyle
+#     sınırlanır, süre yetmiyorsa yeni deneme başlatılmaz
+#   - ETag / Last-Modified destekleyen upstream'lere koşullu istek (304)
+#   - Her deneme günlük kotaya sayılır (utils/quota); kota dolunca istek atılmaz
+
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+# (url, params) → {"etag", "last_modified", "data"}
+_validators = {}
+_validators_lock = threading.Lock()
+
+
+class UpstreamError(Exception):
+    """Upstream başarısız cevap döndü veya tüm denemeler tükendi"""
+
+
+class UpstreamResponse:
+    """Upstream cevabı (304 ise önceki gövde data'da döner)"""
+
+    def __init__(self, status_code, data, not_modified=False, attempts=1):
+        self.status_code = status_code
+        self.data = data
+        self.not_modified = not_modified
+        self.attempts = attempts
+
+    @property
+    def ok(self):
+        return self.status_code == 200 or self.not_modified
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise UpstreamError(f"HTTP {self.status_code}")
+
+
+def _get_session():
+    """Worker (PID) başına tek Session; fork sonrası yeniden kurulur"""
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=Config.UPSTREAM_POOL_CONNECTIONS,
+                pool_maxsize=Config.UPSTREAM_POOL_MAXSIZE,
+                max_retries=0  # tekrar denemeyi kendimiz yapıyoruz (jitter + log)
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+            _session_pid = pid
+    return _session
+
+
+def _backoff(attempt, retry_after=None):
+    """Jitter'lı exponential backoff (saniye)"""
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), Config.UPSTREAM_BACKOFF_MAX)
+        except ValueError:
+            pass
+    base = min(Config.UPSTREAM_BACKOFF_MAX, Config.UPSTREAM_BACKOFF_BASE * (2 ** attempt))
+    return base * random.uniform(0.5, 1.5)
+
+
+def _validator_key(url, params):
+    return url, tuple(sorted((params or {}).items()))
+
+
+def _attempt_timeout(timeout, deadline):
+    """
+    Kalan süreye sığdırılmış (bağlantı, okuma) timeout'u
+
+    Returns:
+        Tuple; deadline yoksa timeout'un kendisi, deneme için süre kalmadıysa None
+    """
+    if deadline is None:
+        return timeout
+    budget = deadline - time.monotonic() - Config.UPSTREAM_DEADLINE_MARGIN
+    if budget < Config.UPSTREAM_MIN_ATTEMPT_SECONDS:
+        return None
+    return tuple(min(t, budget) for t in timeout)
+
+
+def get_json(provider, url, params=None, headers=None, conditional=True, deadline=None):
+    """
+    Upstream'e GET isteği at, JSON gövdesini döndür
+
+    Args:
+        provider: "collectapi", "newsapi" (timeout ve loglar için)
+        url: İstek adresi
+        params: Query parametreleri
+        headers: Ek header'lar (authorization vb.)
+        conditional: True ise önceki ETag/Last-Modified ile koşullu istek
+        deadline: Mutlak son an (time.monotonic); None ise run_parallel'in
+            deadline'ı (current_deadline) kullanılır
+
+    Returns:
+        UpstreamResponse (ağ hatalarında tüm denemeler veya süre tükenince
+        UpstreamError, günlük kota dolduysa QuotaExceeded)
+    """
+    session = _get_session()
+    timeout = Config.UPSTREAM_TIMEOUTS.get(provider, Config.UPSTREAM_DEFAULT_TIMEOUT)
+    if deadline is None:
+        deadline = current_deadline()
+    key = _validator_key(url, params)
+
+    request_headers = dict(headers or {})
+    cached = None
+    if conditional:
+        with _validators_lock:
+            cached = _validators.get(key)
+        if cached:
+            if cached.get("etag"):
+                request_headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                request_headers["If-Modified-Since"] = cached["last_modified"]
+
+    attempts = Config.UPSTREAM_MAX_RETRIES + 1
+    made = 0
+    last_error = None
+
+    def can_retry(attempt, delay):
+        if attempt + 1 >= attempts:
+            return False
+        # Beklemeden sonra bir deneme daha sığmıyorsa tekrar yok
+        return deadline is None or _attempt_timeout(timeout, deadline - delay) is not None
+
+    for attempt in range(attempts):
+        attempt_timeout = _attempt_timeout(timeout, deadline)
+        if attempt_timeout is None:
+            last_error = last_error or "deadline doldu"
+            break
+
+        check_quota(provider)
+        record_call(provider)
+        made += 1
+        try:
+            response = session.get(url, params=params, headers=request_headers, timeout=attempt_timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            last_error = e
+            delay = _backoff(attempt)
+            if not can_retry(attempt, delay):
+                break
+            logger.warning(f"🔁 {provider} bağlantı hatası, {delay:.1f}s sonra tekrar ({attempt + 1}/{attempts}): {e}")
+            time.sleep(delay)
+            continue
+
+        if response.status_code in _RETRY_STATUSES:
+            delay = _backoff(attempt, response.headers.get("Retry-After"))
+            if can_retry(attempt, delay):
+                logger.warning(f"🔁 {provider} HTTP {response.status_code}, {delay:.1f}s sonra tekrar ({attempt + 1}/{attempts})")
+                time.sleep(delay)
+                continue
+
+        if response.status_code == 304 and cached is not None:
+            logger.info(f"♻️ {provider} değişmedi (304)")
+            return UpstreamResponse(304, cached["data"], not_modified=True, attempts=attempt + 1)
+
+        if response.status_code != 200:
+            return UpstreamResponse(response.status_code, None, attempts=attempt + 1)
+
+        data = response.json()
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if conditional and (etag or last_modified):
+            with _validators_lock:
+                _validators[key] = {"etag": etag, "last_modified": last_modified, "data": data}
+
+        return UpstreamResponse(200, data, attempts=attempt + 1)
+
+    raise UpstreamError(f"{provider}: {made} deneme başarısız ({last_error})")
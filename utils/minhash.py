@@ -0,0 +1,141 @@
+import re
+import random
+import hashlib
+from array import array
+
+# ==========================================
+# MINHASH + LSH (YAKIN KOPYA TESPİTİ)
+# ==========================================
+# İki metnin karakter shingle kümelerinin Jaccard benzerliği, MinHash
+# imzalarındaki eşit konumların oranıyla tahmin edilir. LSH imzayı
+# bantlara böler; en az bir bandı birebir aynı olan metinler aday olur.
+# Böylece yeni bir metin için tüm pencereyle karşılaştırma yapılmaz,
+# sadece birkaç aday kontrol edilir.
+#
+#   bands=16, rows=4 → ~%50 benzerlikte aday olma olasılığı ~%65,
+#                      ~%80 benzerlikte ~%99.9
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_text(text):
+    """Küçük harf (Türkçe İ/I dahil), noktalama yok, tek boşluk"""
+    text = (text or "").replace("İ", "i").replace("I", "ı").lower()
+    return " ".join(_WORD.findall(text))
+
+
+class MinHasher:
+    """Sabit tohumla üretilmiş num_perm hash fonksiyonlu MinHash"""
+
+    def __init__(self, num_perm=64, shingle_size=4, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._params = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def shingles(self, text):
+        """Normalize metnin karakter k-gram'larının 64 bit hash'leri"""
+        text = normalize_text(text)
+        k = self.shingle_size
+        if len(text) <= k:
+            grams = {text} if text else set()
+        else:
+            grams = {text[i:i + k] for i in range(len(text) - k + 1)}
+        return [
+            int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "big")
+            for g in grams
+        ]
+
+    def signature(self, text):
+        """
+        Metnin MinHash imzası
+
+        Returns:
+            array('I') (num_perm x 32 bit); boş metin için None
+        """
+        hashes = self.shingles(text)
+        if not hashes:
+            return None
+        return array("I", (
+            min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH
+            for a, b in self._params
+        ))
+
+
+def similarity(sig_a, sig_b):
+    """İki imzadan tahmini Jaccard benzerliği (0..1)"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def to_bytes(signature):
+    return signature.tobytes()
+
+
+def from_bytes(data):
+    signature = array("I")
+    signature.frombytes(bytes(data))
+    return signature
+
+
+class LSHIndex:
+    """Bant bazlı LSH index'i: key → imza, bant → key kümesi"""
+
+    def __init__(self, bands=16, rows=4):
+        self.bands = bands
+        self.rows = rows
+        self._tables = [{} for _ in range(bands)]
+        self._signatures = {}
+
+    def _band_keys(self, signature):
+        r = self.rows
+        return [signature[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def add(self, key, signature):
+        if key in self._signatures:
+            return
+        self._signatures[key] = signature
+        for table, band in zip(self._tables, self._band_keys(signature)):
+            table.setdefault(band, set()).add(key)
+
+    def remove(self, key):
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for table, band in zip(self._tables, self._band_keys(signature)):
+            bucket = table.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del table[band]
+
+    def candidates(self, signature):
+        """En az bir bandı aynı olan key'ler"""
+        found = set()
+        for table, band in zip(self._tables, self._band_keys(signature)):
+            found.update(table.get(band, ()))
+        return found
+
+    def best_match(self, signature, threshold):
+        """
+        Eşik üstündeki en benzer key
+
+        Returns:
+            (key, benzerlik) or (None, 0.0)
+        """
+        best_key, best_score = None, 0.0
+        for key in self.candidates(signature):
+            score = similarity(signature, self._signatures[key])
+            if score >= threshold and score > best_score:
+                best_key, best_score = key, score
+        return best_key, best_score
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+    def __len__(self):
+        return len(self._signatures)
@@ -0,0 +1,79 @@
+import base64
+import binascii
+from datetime import datetime
+import ujson
+
+# ==========================================
+# KEYSET (CURSOR) SAYFALAMA
+# ==========================================
+# OFFSET yerine son satırın sıralama anahtarı istemciye opak bir cursor
+# olarak verilir; sonraki sayfa "(anahtar) < (cursor)" ile index üzerinden
+# okunur. Sayfa maliyeti derinlikten bağımsızdır, araya yeni satır girse
+# bile aynı satır iki kez gelmez.
+#
+# SQL tarafı: sıralama anahtarı SELECT'in SON kolonları olarak seçilir,
+# LIMIT sayfa boyutu + 1 verilir; paginate() fazladan satırdan bir sonraki
+# sayfanın var olduğunu anlar ve anahtar kolonlarını cevaptan çıkarır.
+
+
+class InvalidCursor(ValueError):
+    """İstemcinin gönderdiği cursor çözülemedi"""
+
+
+def encode_cursor(*values):
+    """Sıralama anahtarını opak, URL-safe bir string'e çevir"""
+    plain = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = ujson.dumps(plain).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    """
+    encode_cursor'ın tersi
+
+    Args:
+        cursor: İstemciden gelen string (None → None)
+        size: Beklenen anahtar uzunluğu
+
+    Returns:
+        Tuple or None
+    """
+    if not cursor:
+        return None
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = ujson.loads(raw)
+    except (binascii.Error, ValueError):
+        raise InvalidCursor("Geçersiz cursor")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Geçersiz cursor")
+
+    return tuple(values)
+
+
+def page_limit(requested, default, maximum):
+    """İstenen sayfa boyutunu 1..maximum aralığına sıkıştır"""
+    if requested is None:
+        return default
+    return max(1, min(requested, maximum))
+
+
+def paginate(rows, limit, key_size):
+    """
+    LIMIT limit + 1 ile çekilmiş satırlardan sayfa ve sonraki cursor'ı üret
+
+    Args:
+        rows: Son key_size kolonu sıralama anahtarı olan satırlar
+        limit: Sayfa boyutu
+        key_size: Anahtar kolon sayısı
+
+    Returns:
+        (sayfa satırları (anahtar kolonları hariç), next_cursor or None)
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = encode_cursor(*rows[-1][-key_size:]) if has_more else None
+    return [row[:-key_size] for row in rows], next_cursor
@@ -0,0 +1,87 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+
+# Çalışan görevin mutlak deadline'ı (time.monotonic); iç içe run_parallel
+# çağrılarında en yakın olan geçerli. utils/http_client tekrar denemelerini
+# buna göre kısar: süresi dolup bırakılan görev arka planda kota harcamaz.
+_local = threading.local()
+
+
+class DeadlineExceeded(Exception):
+    """Görev toplam süre (deadline) içinde bitmedi"""
+
+
+def current_deadline():
+    """Bu thread'deki görevin mutlak deadline'ı (time.monotonic) or None"""
+    return getattr(_local, "deadline", None)
+
+
+def _with_deadline(fn, deadline_at):
+    def run():
+        _local.deadline = deadline_at
+        try:
+            return fn()
+        finally:
+            _local.deadline = None
+    return run
+
+
+def run_parallel(tasks, deadline, max_workers=None):
+    """
+    Birbirinden bağımsız görevleri aynı anda çalıştırır, tek bir toplam süre uygular.
+
+    En kötü durumda süre = en yavaş görev (toplamları değil). Süresi dolan
+    görevler arka planda bitmeye bırakılır, sonuçları beklenmez. Görevler
+    deadline'ı current_deadline() ile görür; çağıranın kendi deadline'ı
+    daha yakınsa o geçerlidir.
+
+    Args:
+        tasks: {isim: parametresiz fonksiyon}
+        deadline: Tüm görevler için toplam süre (saniye)
+        max_workers: Thread sayısı (None → görev sayısı)
+
+    Returns:
+        {isim: sonuç}; hata veren görevlerde exception nesnesi,
+        süresi dolanlarda DeadlineExceeded
+    """
+    if not tasks:
+        return {}
+
+    started = time.monotonic()
+    deadline_at = started + deadline
+    inherited = current_deadline()
+    if inherited is not None:
+        deadline_at = min(deadline_at, inherited)
+
+    executor = ThreadPoolExecutor(
+        max_workers=max_workers or len(tasks),
+        thread_name_prefix="upstream"
+    )
+
+    try:
+        futures = {executor.submit(_with_deadline(fn, deadline_at)): name for name, fn in tasks.items()}
+        done, not_done = wait(futures, timeout=max(0.0, deadline_at - started))
+
+        results = {}
+        for future, name in futures.items():
+            if future in not_done:
+                future.cancel()
+                results[name] = DeadlineExceeded(f"{name}: {deadline}s içinde bitmedi")
+                logger.warning(f"⏱️ {name} {deadline}s deadline'ı aştı")
+                continue
+
+            error = future.exception()
+            results[name] = error if error is not None else future.result()
+
+        logger.debug(f"⚡ {len(tasks)} görev paralel çalıştı ({time.monotonic() - started:.2f}s)")
+        return results
+
+    finally:
+        # Bitmeyen görevleri bekleme (deadline zaten doldu)
+        executor.shutdown(wait=False, cancel_futures=True)
+
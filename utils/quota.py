@@ -0,0 +1,101 @@
+import threading
+import logging
+from datetime import datetime, timedelta
+from config import Config
+from utils import cache
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# UPSTREAM KOTA SAYAÇLARI
+# ==========================================
+# Sağlayıcı başına günlük (UTC) çağrı sayısı paylaşılan cache'te tutulur:
+#   nouvsapp:quota:newsapi:20240101 → 37
+# Tüm worker'lar aynı sayacı artırır; gün bitince key TTL ile düşer.
+# utils/http_client her gerçek istek denemesinde (retry'lar dahil) sayar.
+
+# Backend yoksa worker içi sayaç
+_local_counts = {}
+_local_lock = threading.Lock()
+
+
+class QuotaExceeded(Exception):
+    """Sağlayıcının günlük kotası doldu"""
+
+
+def _today():
+    return datetime.utcnow().strftime("%Y%m%d")
+
+
+def _usage_key(provider, day=None):
+    return cache.make_key("quota", provider, day or _today())
+
+
+def seconds_until_reset():
+    """UTC gün sonuna kalan süre (saniye)"""
+    now = datetime.utcnow()
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(1.0, (midnight - now).total_seconds())
+
+
+def daily_quota(provider):
+    """Günlük kota, tanımsızsa None (sınırsız)"""
+    return Config.UPSTREAM_DAILY_QUOTA.get(provider)
+
+
+def record_call(provider):
+    """Bir upstream çağrısını say → bugünkü toplam"""
+    key = _usage_key(provider)
+
+    if cache.backend:
+        try:
+            # Ertesi günün ortasına kadar tut (saat farkı / geç okumalar için)
+            ttl_ms = int((seconds_until_reset() + 43200) * 1000)
+            return cache.backend.incr(key, ttl_ms)
+        except Exception as e:
+            logger.error(f"❌ Kota sayacı hatası ({provider}): {e}")
+
+    with _local_lock:
+        _local_counts[key] = _local_counts.get(key, 0) + 1
+        return _local_counts[key]
+
+
+def calls_today(provider):
+    """Bugün yapılan çağrı sayısı"""
+    key = _usage_key(provider)
+
+    if cache.backend:
+        try:
+            return cache.backend.get_int(key)
+        except Exception as e:
+            logger.error(f"❌ Kota sayacı okuma hatası ({provider}): {e}")
+
+    with _local_lock:
+        return _local_counts.get(key, 0)
+
+
+def remaining(provider):
+    """Bugün kalan çağrı hakkı, kota tanımsızsa None"""
+    quota = daily_quota(provider)
+    if quota is None:
+        return None
+    return max(0, quota - calls_today(provider))
+
+
+def check_quota(provider):
+    """Kota dolduysa QuotaExceeded"""
+    left = remaining(provider)
+    if left is not None and left <= 0:
+        raise QuotaExceeded(f"{provider} günlük kotası doldu ({daily_quota(provider)})")
+
+
+def quota_stats():
+    """Sağlayıcı başına bugünkü kullanım"""
+    return {
+        provider: {
+            "quota": quota,
+            "used": calls_today(provider),
+            "remaining": remaining(provider),
+        }
+        for provider, quota in Config.UPSTREAM_DAILY_QUOTA.items()
+    }
@@ -0,0 +1,105 @@
+from array import array
+
+# ==========================================
+# RUN-LENGTH RING BUFFER (TEK SEMBOL)
+# ==========================================
+# Geçmiş tablolarıyla aynı model: her run (başlangıç, bitiş, kur, tick
+# sayısı). Sabit boyutlu array'ler (epoch saniye / kur float64, tick sayısı
+# int) dairesel kullanılır; dolunca en eski run'ın üzerine yazılır. Run'lar
+# kronolojik olduğundan bitiş zamanları sıralıdır → pencere başı ikili
+# aramayla bulunur.
+
+
+class RunBuffer:
+    """Bir sembolün son run'ları: starts / ends / rates / counts"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.starts = array("d", bytes(8 * capacity))
+        self.ends = array("d", bytes(8 * capacity))
+        self.rates = array("d", bytes(8 * capacity))
+        self.counts = array("l", [0]) * capacity
+        self._head = 0    # en eski run'ın fiziksel indeksi
+        self._size = 0
+        # Üzerine yazılan en yeni run'ın bitişi: bundan eski sorgular eksik kalır
+        self.evicted_until = None
+
+    def _phys(self, i):
+        return (self._head + i) % self.capacity
+
+    def __len__(self):
+        return self._size
+
+    def last(self):
+        """En yeni run → (başlangıç, bitiş, kur) or None"""
+        if not self._size:
+            return None
+        p = self._phys(self._size - 1)
+        return self.starts[p], self.ends[p], self.rates[p]
+
+    def append(self, start, end, rate, count=1):
+        if self._size < self.capacity:
+            p = self._phys(self._size)
+            self._size += 1
+        else:
+            p = self._head
+            self.evicted_until = self.ends[p]
+            self._head = (self._head + 1) % self.capacity
+
+        self.starts[p] = start
+        self.ends[p] = end
+        self.rates[p] = rate
+        self.counts[p] = count
+
+    def extend_last(self, end):
+        """En yeni run'ın bitişini ilerlet (aynı kur tekrar geldi)"""
+        p = self._phys(self._size - 1)
+        self.ends[p] = end
+        self.counts[p] += 1
+
+    def upsert(self, start, end, rate, count):
+        """
+        DB satırını uygula: aynı başlangıçlı son run güncellenir, daha
+        yenisi eklenir, daha eskisi (zaten bellekte) yok sayılır
+        """
+        last = self.last()
+        if last is not None and start < last[0]:
+            return
+        if last is not None and start == last[0]:
+            p = self._phys(self._size - 1)
+            self.ends[p] = end
+            self.rates[p] = rate
+            self.counts[p] = count
+            return
+        self.append(start, end, rate, count)
+
+    def first_ending_at(self, since):
+        """bitiş >= since olan ilk run'ın mantıksal indeksi (yoksa len)"""
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ends[self._phys(mid)] < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def points(self, since):
+        """
+        Pencere içindeki tick'ler (geçmiş endpoint'inin SQL yoluyla aynı
+        kural): n tick'lik run başlangıç ile bitiş arasına eşit aralıklı n
+        noktaya açılır, since'ten öncekiler atlanır
+
+        Returns:
+            [(epoch, kur)] kronolojik
+        """
+        result = []
+        for i in range(self.first_ending_at(since), self._size):
+            p = self._phys(i)
+            start, end, rate, count = self.starts[p], self.ends[p], self.rates[p], self.counts[p]
+            step = (end - start) / (count - 1) if count > 1 else 0.0
+            for k in range(count):
+                ts = start + step * k
+                if ts >= since:
+                    result.append((ts, rate))
+        return result